@@ -0,0 +1,11 @@
+import os
+import sys
+
+# --- BENCHMARKS DO SALOMÃO ---
+#
+# Os módulos do servidor vivem em src/ e importam-se pelo nome (como em "python app.py"),
+# por isso a pasta é acrescentada ao sys.path antes de qualquer import do servidor.
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks import fake_genai, fixtures, harness, load, micro, regression, results
+
+# --- LINHA DE COMANDO ---
+#
+#   python -m benchmarks run                         (micro + carga, resultados em benchmarks/results/)
+#   python -m benchmarks run --only micro
+#   python -m benchmarks run --concurrency 1,8,32 --stream --mode asgi --rate-limit 0.1
+#   python -m benchmarks compare antes.json depois.json
+#   python -m benchmarks check                       (regressões do roteador; código 1 se falhar)
+
+
+def run(args):
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f"salomao-bench-{args.verses}.sqlite.db")
+    if not args.db and not os.path.exists(db_path):
+        print(f"🧪 Gerando base sintética com {args.verses} versículos em {db_path}...")
+        fixtures.build_fixture(db_path, total_verses=args.verses)
+
+    backend = fake_genai.FakeBackend(
+        latency=args.latency,
+        tokens_per_s=args.tokens_per_s,
+        answer_tokens=args.answer_tokens,
+        rate_limit_ratio=args.rate_limit,
+        seed=args.seed,
+    )
+    app = harness.configure_app(db_path, backend, cache=args.cache, max_concurrent=args.max_concurrent)
+    questions = fixtures.load_questions(args.questions)
+
+    output = {}
+    if args.only in (None, "micro"):
+        print("⏱️ Microbenchmarks...")
+        output["micro"] = micro.run_micro(app, questions, repeat=args.repeat)
+    if args.only in (None, "load"):
+        levels = [int(c) for c in args.concurrency.split(",")]
+        output["load"] = load.run_load(app, questions, levels, args.requests, stream=args.stream, mode=args.mode)
+        output["fake_genai_calls"] = backend.calls
+        output["models"] = app.model_router.stats()
+
+    config = {k: v for k, v in vars(args).items() if k != "func"}
+    path = results.save(output, config, args.out)
+    print(f"📊 Resultados gravados em {path}")
+    for level in output.get("load", []):
+        lat = level["latency"]
+        print(f"  c={level['concurrency']:>4}  {level['throughput_rps']:>8} req/s  "
+              f"p50={lat.get('p50_ms')}ms  p95={lat.get('p95_ms')}ms  p99={lat.get('p99_ms')}ms  {level['statuses']}")
+
+
+def compare(args):
+    rev_a, rev_b, rows = results.compare(args.before, args.after)
+    print(f"{'métrica':<60} {rev_a:>12} {rev_b:>12} {'Δ%':>8}")
+    for key, before, after, change in rows:
+        print(f"{key:<60} {before:>12} {after:>12} {'' if change is None else change:>8}")
+
+
+def check(args):
+    failures = regression.run_checks()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Todas as verificações passaram.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks do ChatBot Salomão.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="executa microbenchmarks e/ou teste de carga")
+    p.add_argument("--only", choices=["micro", "load"])
+    p.add_argument("--db", help="base SQLite a usar (padrão: base sintética em /tmp)")
+    p.add_argument("--verses", type=int, default=fixtures.DEFAULT_VERSES)
+    p.add_argument("--questions", help="ficheiro de perguntas (padrão: benchmarks/questions.txt)")
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--concurrency", default="1,4,16,64")
+    p.add_argument("--requests", type=int, help="pedidos por nível (padrão: 4x a concorrência)")
+    p.add_argument("--stream", action="store_true", help="usa /api/chat/stream e mede o tempo até ao 1º token")
+    p.add_argument("--mode", choices=["flask", "asgi"], default="flask")
+    p.add_argument("--cache", action="store_true", help="mantém a cache de respostas ligada")
+    p.add_argument("--max-concurrent", type=int, default=64)
+    p.add_argument("--latency", type=float, default=0.8, help="segundos até ao 1º token do Gemini falso")
+    p.add_argument("--tokens-per-s", type=float, default=80.0)
+    p.add_argument("--answer-tokens", type=int, default=120)
+    p.add_argument("--rate-limit", type=float, default=0.0, help="fração de chamadas que devolvem 429")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", default=results.RESULTS_DIR)
+    p.set_defaults(func=run)
+
+    c = sub.add_parser("compare", help="compara dois ficheiros de resultados")
+    c.add_argument("before")
+    c.add_argument("after")
+    c.set_defaults(func=compare)
+
+    k = sub.add_parser("check", help="verificações de regressão do roteador de modelos (sem rede)")
+    k.set_defaults(func=check)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+# --- SUBSTITUTO OFFLINE DO GEMINI ---
+#
+# Imita a parte da API do google.generativeai usada pelo servidor
+# (configure, types.GenerationConfig e GenerativeModel.generate_content, com e
+# sem stream=True) com latência, ritmo de tokens e erros 429 configuráveis.
+# Não importa o SDK verdadeiro: os benchmarks correm sem ele instalado.
+
+LOREM = (
+    "Meu filho, a sabedoria começa no temor do Senhor e cresce quando ouvimos com "
+    "humildade. A graça de Deus não é algo que conquistamos, é um presente que "
+    "recebemos de coração aberto e que muda a forma como tratamos os outros."
+).split()
+
+
+class FakeRateLimit(Exception):
+    code = 429
+
+    def __init__(self, model_name):
+        super().__init__(f"429 Resource has been exhausted (fake quota for {model_name})")
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    @property
+    def text(self):
+        return "".join(chunk.text for chunk in self._chunks)
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+
+class FakeBackend:
+    """Configuração partilhada pelos modelos falsos.
+
+    latency: segundos até ao primeiro token; tokens_per_s: ritmo de geração;
+    answer_tokens: tamanho da resposta; rate_limit_ratio: fração de chamadas que
+    falham com 429; per_model permite sobrepor estes valores por nome de modelo.
+    """
+
+    def __init__(self, latency=0.8, tokens_per_s=80.0, answer_tokens=120, rate_limit_ratio=0.0,
+                 per_model=None, seed=None):
+        self.latency = latency
+        self.tokens_per_s = tokens_per_s
+        self.answer_tokens = answer_tokens
+        self.rate_limit_ratio = rate_limit_ratio
+        self.per_model = per_model or {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def option(self, model_name, name):
+        return self.per_model.get(model_name, {}).get(name, getattr(self, name))
+
+    def roll(self):
+        with self._lock:
+            return self._random.random()
+
+    def record(self, model_name, outcome):
+        with self._lock:
+            counts = self.calls.setdefault(model_name, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def factory(self, model_name):
+        """Usar como client_factory do ModelRouter."""
+        return FakeGenerativeModel(model_name, self)
+
+    def module(self):
+        """Substituto do módulo google.generativeai (para app._genai)."""
+        return FakeGenAI(self)
+
+
+class FakeGenerationConfig:
+    def __init__(self, **options):
+        self.__dict__.update(options)
+
+
+class FakeGenAI:
+    types = SimpleNamespace(GenerationConfig=FakeGenerationConfig)
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def configure(self, **options):
+        pass
+
+    def GenerativeModel(self, model_name):  # noqa: N802 (mesmo nome do SDK)
+        return FakeGenerativeModel(model_name, self.backend)
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name, backend):
+        self.model_name = model_name
+        self.backend = backend
+
+    def _tokens(self):
+        count = int(self.backend.option(self.model_name, "answer_tokens"))
+        return [LOREM[i % len(LOREM)] + " " for i in range(count)]
+
+    def _stream(self, tokens, delay):
+        for token in tokens:
+            if delay:
+                time.sleep(delay)
+            yield FakeChunk(token)
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        backend = self.backend
+        time.sleep(backend.option(self.model_name, "latency"))
+        if backend.roll() < backend.option(self.model_name, "rate_limit_ratio"):
+            backend.record(self.model_name, "429")
+            raise FakeRateLimit(self.model_name)
+        backend.record(self.model_name, "ok")
+
+        tokens = self._tokens()
+        rate = backend.option(self.model_name, "tokens_per_s")
+        delay = 1.0 / rate if rate else 0.0
+        if stream:
+            return self._stream(tokens, delay)
+        time.sleep(delay * len(tokens))
+        return FakeResponse([FakeChunk("".join(tokens))])
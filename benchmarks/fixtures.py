@@ -0,0 +1,85 @@
+import os
+import random
+import sqlite3
+
+# --- BASE SINTÉTICA COM O FORMATO DA NVI ---
+#
+# Mesmas tabelas/colunas usadas pelo servidor (book, verse) e volume parecido com a
+# Bíblia completa, gerado de forma determinística a partir de uma semente.
+
+BOOKS = [
+    "Gênesis", "Êxodo", "Levítico", "Números", "Deuteronômio", "Josué", "Juízes", "Rute",
+    "1 Samuel", "2 Samuel", "1 Reis", "2 Reis", "1 Crônicas", "2 Crônicas", "Esdras", "Neemias",
+    "Ester", "Jó", "Salmos", "Provérbios", "Eclesiastes", "Cânticos", "Isaías", "Jeremias",
+    "Lamentações", "Ezequiel", "Daniel", "Oséias", "Joel", "Amós", "Obadias", "Jonas",
+    "Miquéias", "Naum", "Habacuque", "Sofonias", "Ageu", "Zacarias", "Malaquias",
+    "Mateus", "Marcos", "Lucas", "João", "Atos", "Romanos", "1 Coríntios", "2 Coríntios",
+    "Gálatas", "Efésios", "Filipenses", "Colossenses", "1 Tessalonicenses", "2 Tessalonicenses",
+    "1 Timóteo", "2 Timóteo", "Tito", "Filemom", "Hebreus", "Tiago", "1 Pedro", "2 Pedro",
+    "1 João", "2 João", "3 João", "Judas", "Apocalipse",
+]
+
+VOCABULARY = """
+o a e de que do da em para com não se os as ao seu sua Senhor Deus povo filho filhos
+terra rei casa coração disse porque todos quando eles ele ela mas pois eis também
+Israel Jerusalém caminho palavra nome mão mãos dia dias vida morte pai mãe homem mulher
+justiça paz graça fé amor esperança misericórdia perdão pecado pecados sabedoria
+conhecimento temor luz trevas verdade espírito santo glória reino céu céus água fogo
+sangue pão vinho ovelhas pastor templo altar sacrifício lei mandamentos aliança promessa
+salvação salvador redenção cruz ressurreição igreja irmãos discípulos apóstolo profeta
+oração orar louvor adoração cântico alegria tristeza choro consolo força poder servo
+servos inimigos nações cidade monte deserto rio mar fruto árvore semente colheita
+""".split()
+
+DEFAULT_VERSES = 31_000
+
+
+def build_fixture(path, total_verses=DEFAULT_VERSES, seed=42, with_fts=True):
+    """Cria (ou recria) em path uma base com as tabelas book e verse da NVI."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    # Frequências com cauda longa (lei de Zipf), como num texto real
+    weights = [1.0 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript("""
+            CREATE TABLE book (id INTEGER PRIMARY KEY, book_reference_id INTEGER,
+                               testament_reference_id INTEGER, name TEXT);
+            CREATE TABLE verse (id INTEGER PRIMARY KEY, book_id INTEGER, chapter INTEGER,
+                                verse INTEGER, text TEXT);
+        """)
+        conn.executemany(
+            "INSERT INTO book VALUES (?, ?, ?, ?)",
+            [(i, i, 1 if i <= 39 else 2, name) for i, name in enumerate(BOOKS, 1)],
+        )
+
+        per_book = max(1, total_verses // len(BOOKS))
+        rows = []
+        verse_id = 1
+        for book_id in range(1, len(BOOKS) + 1):
+            chapter, verse = 1, 1
+            for _ in range(per_book):
+                words = rng.choices(VOCABULARY, weights=weights, k=rng.randint(8, 30))
+                text = " ".join(words).capitalize() + "."
+                rows.append((verse_id, book_id, chapter, verse, text))
+                verse_id += 1
+                verse += 1
+                if verse > rng.randint(15, 40):
+                    chapter, verse = chapter + 1, 1
+        conn.executemany("INSERT INTO verse VALUES (?, ?, ?, ?, ?)", rows)
+
+        if with_fts:
+            conn.execute("CREATE VIRTUAL TABLE full_text_search USING fts5(text, content='verse', content_rowid='id')")
+            conn.execute("INSERT INTO full_text_search(rowid, text) SELECT id, text FROM verse")
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def load_questions(path=None):
+    path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.txt')
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
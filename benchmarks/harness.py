@@ -0,0 +1,66 @@
+import math
+import statistics
+
+import benchmarks  # noqa: F401  (coloca src/ no sys.path)
+
+# --- PREPARAÇÃO DO SERVIDOR PARA MEDIÇÃO ---
+
+
+def configure_app(db_path, backend, cache=False, max_concurrent=64, max_queue=256,
+                  per_client_limit=10_000, queue_timeout=30.0):
+    """Importa o app e aponta-o para a base sintética e para o Gemini falso.
+
+    Os limites de admissão/cota são alargados para medir o servidor e não as
+    proteções; cache=False garante que cada pedido chega ao "Gemini".
+    """
+    import app
+    from admission import AdmissionController, TokenBucket
+    from cache import AnswerCache
+    from database import ConnectionPool
+    from models import ModelRouter
+
+    app.DB_PATH = db_path
+    app.db_pool.close_all()
+    app.db_pool = ConnectionPool(db_path)
+    app.verse_index = None
+    # Índice ao lado da base sintética, carregado (ou construído) antes da medição
+    app.VERSE_INDEX_PATH = db_path + ".index"
+    # ttl=0: todas as entradas expiram de imediato, ou seja, cache desligada
+    app.answer_cache = AnswerCache(":memory:", ttl=None if cache else 0)
+    app.admission = AdmissionController(max_concurrent, max_queue, per_client_limit, queue_timeout)
+    app.gemini_bucket = TokenBucket(rate=1e9, capacity=1e9)
+    # O app nunca chega a importar o SDK verdadeiro (ver app.gemini)
+    app._genai = backend.module()
+    app.model_router = ModelRouter(
+        app.MODELS_TO_TRY,
+        client_factory=backend.factory,
+        hedge_after=app.model_router.hedge_after,
+        max_workers=max_concurrent * len(app.MODELS_TO_TRY),
+        charge_extra=app.model_router.charge_extra,
+    )
+    app.load_verse_index()
+    return app
+
+
+def percentile(sorted_values, pct):
+    """Percentil pelo método do posto mais próximo (valores já ordenados)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples):
+    """Resumo em milissegundos de uma lista de durações em segundos."""
+    values = sorted(samples)
+    if not values:
+        return {"n": 0}
+    to_ms = lambda v: round(v * 1000, 4)  # noqa: E731
+    return {
+        "n": len(values),
+        "mean_ms": to_ms(statistics.fmean(values)),
+        "p50_ms": to_ms(percentile(values, 50)),
+        "p95_ms": to_ms(percentile(values, 95)),
+        "p99_ms": to_ms(percentile(values, 99)),
+        "max_ms": to_ms(values[-1]),
+    }
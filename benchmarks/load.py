@@ -0,0 +1,121 @@
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import summarize
+
+# --- GERADOR DE CARGA PONTA A PONTA ---
+
+
+class ServerThread:
+    """Sobe o servidor numa porta livre: "flask" (werkzeug com threads) ou "asgi" (uvicorn)."""
+
+    def __init__(self, app, mode="flask"):
+        self.app = app
+        self.mode = mode
+        self.port = None
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        if self.mode == "asgi":
+            import socket
+
+            import uvicorn
+
+            import asgi
+
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+            sock.close()
+            config = uvicorn.Config(asgi.application, host="127.0.0.1", port=self.port, log_level="warning")
+            self._server = uvicorn.Server(config)
+            self._thread = threading.Thread(target=self._server.run, daemon=True)
+            self._thread.start()
+            while not self._server.started:
+                time.sleep(0.05)
+        else:
+            import logging
+
+            from werkzeug.serving import make_server
+
+            # Sem uma linha de log por pedido a competir com a medição
+            logging.getLogger("werkzeug").setLevel(logging.ERROR)
+            self._server = make_server("127.0.0.1", 0, self.app.app, threaded=True)
+            self.port = self._server.server_port
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.mode == "asgi":
+            self._server.should_exit = True
+        else:
+            self._server.shutdown()
+        self._thread.join(timeout=5)
+
+
+def post(port, path, query, stream):
+    """Faz um pedido e devolve (status, latência total, tempo até ao primeiro token)."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    body = json.dumps({"query": query})
+    start = time.perf_counter()
+    first_token = None
+    try:
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        if stream and response.status == 200:
+            status = 200
+            for line in response:
+                if first_token is None and line.startswith(b"event: token"):
+                    first_token = time.perf_counter() - start
+                elif line.startswith(b"event: error"):
+                    status = "stream_error"
+        else:
+            response.read()
+            status = response.status
+    except OSError as e:
+        status = type(e).__name__
+    finally:
+        conn.close()
+    return status, time.perf_counter() - start, first_token
+
+
+def run_level(port, questions, concurrency, requests, stream):
+    path = "/api/chat/stream" if stream else "/api/chat"
+    queries = [questions[i % len(questions)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda q: post(port, path, q, stream), queries))
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status, _, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [o for o in outcomes if o[0] == 200]
+    result = {
+        "concurrency": concurrency,
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "statuses": statuses,
+        "latency": summarize([o[1] for o in ok]),
+    }
+    if stream:
+        result["ttft"] = summarize([o[2] for o in ok if o[2] is not None])
+    return result
+
+
+def run_load(app, questions, concurrency_levels, requests_per_level=None, stream=False, mode="flask"):
+    results = []
+    with ServerThread(app, mode) as server:
+        # Aquecimento: carrega o índice em memória e abre as conexões
+        post(server.port, "/api/chat", questions[0], False)
+        for concurrency in concurrency_levels:
+            requests = requests_per_level or max(concurrency * 4, 20)
+            print(f"🏋️ Concorrência {concurrency}: {requests} pedidos...")
+            results.append(run_level(server.port, questions, concurrency, requests, stream))
+    return results
@@ -0,0 +1,47 @@
+import time
+
+from benchmarks.harness import summarize
+
+# --- MICROBENCHMARKS (RECUPERAÇÃO E PROMPT) ---
+
+
+def measure(fn, inputs, repeat):
+    samples = []
+    for _ in range(repeat):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def run_micro(app, questions, repeat=20):
+    conn = app.db_pool.acquire()
+    try:
+        return _run_micro(app, questions, repeat, conn)
+    finally:
+        app.db_pool.release(conn)
+
+
+def _run_micro(app, questions, repeat, conn):
+    from database import search_verses
+    from retrieval import VerseIndex, build_match_expression
+
+    results = {}
+    start = time.perf_counter()
+    index = VerseIndex.from_connection(conn)
+    results["index_build"] = {"seconds": round(time.perf_counter() - start, 3), **index.stats()}
+    app.verse_index = index
+
+    results["index_search"] = measure(lambda q: index.search(q, k=5), questions, repeat)
+    fts_questions = [q for q in questions if build_match_expression(q)]
+    results["fts5_search"] = measure(
+        lambda q: search_verses(conn, build_match_expression(q), limit=5), fts_questions, repeat
+    )
+    results["fetch_relevant_verses"] = measure(app.fetch_relevant_verses, questions, repeat)
+
+    contexts = [app.fetch_relevant_verses(q) for q in questions]
+    pairs = list(zip(questions, contexts))
+    results["build_prompt"] = measure(lambda pair: app.build_prompt(*pair), pairs, repeat)
+    results["format_source"] = measure(app.format_source, contexts, repeat)
+    return results
@@ -0,0 +1,81 @@
+import benchmarks  # noqa: F401  (coloca src/ no sys.path)
+from benchmarks.fake_genai import FakeBackend, FakeRateLimit
+
+# --- VERIFICAÇÕES DE REGRESSÃO DO ROTEADOR DE MODELOS ---
+#
+# Correm sem rede e sem base: o ModelRouter fala direto com o Gemini falso.
+# Cada verificação devolve uma lista de falhas (vazia = OK).
+
+MODELS = ['gemini-2.5-flash', 'gemini-2.0-flash', 'gemini-1.5-flash']
+
+
+def _router(backend, **options):
+    from models import ModelRouter
+    return ModelRouter(MODELS, backend.factory, **options)
+
+
+def check_rate_limited_backend(requests=500, rate_limit_ratio=0.1, max_failure_ratio=0.01, seed=1):
+    """Com 429 esporádicos, quase todos os pedidos devem ter resposta (generate, hedged e stream)."""
+    failures = []
+    variants = [
+        ("generate", {}, False),
+        ("hedged", {"hedge_after": 0.05}, False),
+        ("stream", {}, True),
+    ]
+    for label, options, stream in variants:
+        backend = FakeBackend(latency=0, tokens_per_s=0, answer_tokens=5,
+                              rate_limit_ratio=rate_limit_ratio, seed=seed)
+        router = _router(backend, **options)
+        errors = 0
+        for _ in range(requests):
+            if stream:
+                events = list(router.stream("pergunta", None))
+                ok = events and events[-1][0] != "error"
+            else:
+                ok = router.generate("pergunta", None)[0] is not None
+            errors += not ok
+        ratio = errors / requests
+        print(f"  {label:<9} {requests - errors}/{requests} respondidos ({ratio:.1%} falhas)")
+        if ratio > max_failure_ratio:
+            failures.append(f"{label}: {ratio:.1%} dos pedidos falharam com {rate_limit_ratio:.0%} de 429")
+    return failures
+
+
+def check_stale_success():
+    """Um sucesso de uma chamada iniciada antes da abertura não fecha o circuito."""
+    from models import CircuitBreaker
+
+    breaker = CircuitBreaker(threshold=1)
+    stale = breaker.generation
+    breaker.record_failure(FakeRateLimit("x"), breaker.generation, now=0.0)
+    breaker.record_success(stale)
+    if breaker.state(now=1.0) != "open":
+        return ["sucesso antigo fechou um circuito aberto"]
+    return []
+
+
+def check_all_open():
+    """Com todos os circuitos abertos, o pedido ainda chega ao Gemini."""
+    backend = FakeBackend(latency=0, tokens_per_s=0, answer_tokens=5)
+    router = _router(backend)
+    for name in MODELS:
+        breaker = router._breakers[name]
+        for _ in range(breaker.threshold):
+            breaker.record_failure(FakeRateLimit("x"), breaker.generation)
+    text, model_name, _ = router.generate("pergunta", None)
+    if text is None:
+        return ["com todos os circuitos abertos o pedido falhou sem chamar o Gemini"]
+    if router.stats()["models"][model_name]["circuit"] != "closed":
+        return ["o sucesso da tentativa forçada não fechou o circuito"]
+    return []
+
+
+CHECKS = [check_rate_limited_backend, check_stale_success, check_all_open]
+
+
+def run_checks():
+    failures = []
+    for check in CHECKS:
+        print(f"🔎 {check.__doc__}")
+        failures.extend(check())
+    return failures
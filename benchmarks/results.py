@@ -0,0 +1,70 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+# --- RESULTADOS VERSIONADOS E COMPARAÇÃO ---
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save(results, config, out_dir=RESULTS_DIR):
+    """Grava <data>-<revisão>.json com os resultados e o contexto da execução."""
+    os.makedirs(out_dir, exist_ok=True)
+    revision = git_revision()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    document = {
+        "schema": 1,
+        "revision": revision,
+        "created_at": now.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    path = os.path.join(out_dir, f"{now:%Y%m%dT%H%M%S}-{revision}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, list):
+        for item in value:
+            # Níveis de carga identificados pela concorrência
+            label = f"c{item['concurrency']}" if isinstance(item, dict) and "concurrency" in item else str(len(out))
+            _flatten(f"{prefix}.{label}", item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(path_a, path_b):
+    """Linhas (métrica, antes, depois, variação %) para as métricas presentes nos dois ficheiros."""
+    with open(path_a, encoding="utf-8") as f:
+        a = json.load(f)
+    with open(path_b, encoding="utf-8") as f:
+        b = json.load(f)
+    flat_a, flat_b = {}, {}
+    _flatten("", a["results"], flat_a)
+    _flatten("", b["results"], flat_b)
+    rows = []
+    for key in sorted(flat_a.keys() & flat_b.keys()):
+        before, after = flat_a[key], flat_b[key]
+        change = round((after - before) / before * 100, 1) if before else None
+        rows.append((key, before, after, change))
+    return a["revision"], b["revision"], rows
@@ -0,0 +1,248 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+# --- CONTROLO DE ADMISSÃO E LIMITE DE COTA ---
+
+
+class Rejected(Exception):
+    """Pedido recusado por falta de capacidade; retry_after em segundos (para o cabeçalho Retry-After).
+
+    source indica quem recusou: "admission" (vagas/fila) ou "quota" (cota local do Gemini).
+    """
+
+    def __init__(self, reason, retry_after, source="admission"):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.source = source
+
+
+class TokenBucket:
+    """Token bucket com reposição contínua: rate fichas por segundo, até capacity acumuladas."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.denied = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, reserve=0):
+        # Chamado sempre com self._lock adquirido: 0 se consumiu uma ficha,
+        # senão os segundos até haver uma ficha acima da reserva
+        self._refill(time.monotonic())
+        reserve = min(reserve, self.capacity - 1)
+        if self._tokens >= 1 + reserve:
+            self._tokens -= 1
+            self.granted += 1
+            return 0.0
+        return (1 + reserve - self._tokens) / self.rate if self.rate > 0 else 60.0
+
+    def try_acquire(self):
+        """Consome uma ficha. Retorna 0 se conseguiu, senão os segundos até haver uma ficha."""
+        with self._lock:
+            wait = self._take()
+            if wait:
+                self.denied += 1
+            return wait
+
+    def acquire(self, timeout, reserve=0):
+        """Espera até timeout segundos pela ficha. Retorna True se conseguiu.
+
+        Com reserve > 0 o pedido tem prioridade baixa: só usa fichas acima dessa
+        reserva, que fica para os pedidos interativos (try_acquire).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                wait = self._take(reserve)
+            if not wait:
+                return True
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                with self._lock:
+                    self.denied += 1
+                return False
+            time.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_s": self.rate,
+                "capacity": self.capacity,
+                "available": round(self._tokens, 2),
+                "granted": self.granted,
+                "denied": self.denied,
+            }
+
+
+class _Ticket:
+    __slots__ = ("client_id", "granted", "released", "wake")
+
+    def __init__(self, client_id, wake=None):
+        self.client_id = client_id
+        self.granted = False
+        self.released = False
+        self.wake = wake
+
+
+class AdmissionController:
+    """Limita pedidos simultâneos com uma fila FIFO curta e um teto por cliente.
+
+    Quando um pedido termina, a vaga passa diretamente para o primeiro da fila.
+    Pedidos além da fila (ou que esperam mais do que queue_timeout) são recusados
+    logo com Rejected, em vez de se acumularem.
+    Serve tanto para threads (slot) como para asyncio (async_slot).
+    """
+
+    def __init__(self, max_concurrent, max_queue, per_client_limit, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.per_client_limit = per_client_limit
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queue = deque()
+        self._per_client = {}
+        self._stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0,
+                       "rejected_client_limit": 0, "rejected_timeout": 0}
+
+    # --- núcleo (sempre com self._lock adquirido) ---
+
+    def _enter(self, ticket):
+        client_count = self._per_client.get(ticket.client_id, 0)
+        if client_count >= self.per_client_limit:
+            self._stats["rejected_client_limit"] += 1
+            raise Rejected("Demasiados pedidos simultâneos deste cliente.", 1)
+        if self._active < self.max_concurrent and not self._queue:
+            self._active += 1
+            ticket.granted = True
+        elif len(self._queue) >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise Rejected("Servidor ocupado, fila cheia.", self.queue_timeout)
+        else:
+            self._queue.append(ticket)
+            self._stats["queued"] += 1
+        self._per_client[ticket.client_id] = client_count + 1
+        if ticket.granted:
+            self._stats["admitted"] += 1
+
+    def _leave_client(self, client_id):
+        count = self._per_client.get(client_id, 0) - 1
+        if count > 0:
+            self._per_client[client_id] = count
+        else:
+            self._per_client.pop(client_id, None)
+
+    def _give_up(self, ticket):
+        """Desiste de esperar; retorna True se a vaga chegou entretanto."""
+        with self._lock:
+            if ticket.granted:
+                return True
+            try:
+                self._queue.remove(ticket)
+            except ValueError:
+                pass
+            self._leave_client(ticket.client_id)
+            self._stats["rejected_timeout"] += 1
+            return False
+
+    def release(self, ticket):
+        wake = None
+        with self._lock:
+            if ticket.released or not ticket.granted:
+                return
+            ticket.released = True
+            self._leave_client(ticket.client_id)
+            if self._queue:
+                # Passa a vaga diretamente ao próximo da fila (ordem de chegada)
+                successor = self._queue.popleft()
+                successor.granted = True
+                self._stats["admitted"] += 1
+                wake = successor.wake
+            else:
+                self._active -= 1
+        if wake is not None:
+            wake()
+
+    # --- modo síncrono (threads do Flask) ---
+
+    def acquire(self, client_id):
+        """Bloqueia até haver vaga (no máximo queue_timeout). Retorna o ticket a passar a release()."""
+        event = threading.Event()
+        ticket = _Ticket(client_id, wake=event.set)
+        with self._lock:
+            self._enter(ticket)
+        if ticket.granted:
+            return ticket
+        event.wait(self.queue_timeout)
+        if not self._give_up(ticket):
+            raise Rejected("Tempo de espera na fila esgotado.", self.queue_timeout)
+        return ticket
+
+    @contextmanager
+    def slot(self, client_id):
+        ticket = self.acquire(client_id)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    # --- modo asyncio ---
+
+    async def acquire_async(self, client_id):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+
+        ticket = _Ticket(client_id, wake=wake)
+        with self._lock:
+            self._enter(ticket)
+        if ticket.granted:
+            return ticket
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Cliente desligou enquanto esperava: devolve a vaga se ela já tinha chegado
+            if self._give_up(ticket):
+                self.release(ticket)
+            raise
+        if not self._give_up(ticket):
+            raise Rejected("Tempo de espera na fila esgotado.", self.queue_timeout)
+        return ticket
+
+    @asynccontextmanager
+    async def async_slot(self, client_id):
+        ticket = await self.acquire_async(client_id)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "active": self._active,
+                "waiting": len(self._queue),
+                "clients": len(self._per_client),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "per_client_limit": self.per_client_limit,
+                "queue_timeout_s": self.queue_timeout,
+            }
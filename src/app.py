@@ -1,35 +1,104 @@
 import os 
+import hmac
+import json
+import logging
 import sqlite3
-import re
-from flask import Flask, jsonify, request
+import threading
+import time
+# Início do arranque (as durações de cada etapa aparecem em /api/ready)
+STARTED_AT = time.perf_counter()
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-import google.generativeai as genai
+from logs import setup_logging
+from metrics import CACHE_LOOKUPS, ERRORS, RATE_LIMITED, REQUEST_SECONDS, REQUESTS, observe_context, registry, span
+from database import ConnectionPool, has_fts_table, search_verses, source_fingerprint
+from retrieval import VerseIndex, build_match_expression
+from index_artifact import InvalidArtifact, load_index, save_index
+from cache import AnswerCache, normalize_query
+from models import ModelRouter
+from admission import AdmissionController, Rejected, TokenBucket
 
 # --- INICIALIZAÇÃO E CONFIGURAÇÕES ---
 
 load_dotenv() 
 
+# Logs com nível (LOG_LEVEL) escritos por uma thread própria, fora do caminho dos pedidos
+setup_logging()
+logger = logging.getLogger("salomao.app")
+
 app = Flask(__name__)
 # CORS configurado para permitir qualquer origem durante o desenvolvimento
 CORS(app, resources={r"/api/*": {"origins": "*"}}) 
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Token exigido pelas rotas /api/admin/* (rotas desativadas se não estiver definido)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 # Localização automática do banco de dados
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'NVI.sqlite.db')
 
-# Inicializa o Cliente Gemini
-try:
-    if not GEMINI_API_KEY:
-        print("❌ ERRO: GEMINI_API_KEY não encontrada no ficheiro .env")
-    else:
-        # Configuração do cliente com a biblioteca correta
-        genai.configure(api_key=GEMINI_API_KEY)
-        print("✨ Cliente Gemini inicializado com sucesso.")
-except Exception as e:
-    print(f"❌ Erro ao conectar com Google AI: {e}")
+# Conexões de leitura reaproveitadas entre pedidos (pool limitado, DB_POOL_SIZE)
+db_pool = ConnectionPool(DB_PATH, size=int(os.getenv("DB_POOL_SIZE", "8")))
+
+# Índice BM25 em memória: lido do artefato pré-construído (build_index.py) ou, se
+# faltar/não corresponder ao banco, construído em segundo plano. Até estar pronto
+# as buscas usam o FTS5 (modo degradado) e /api/ready responde 503.
+VERSE_INDEX_PATH = os.getenv("VERSE_INDEX_PATH", os.path.join(BASE_DIR, 'NVI.index'))
+verse_index = None
+verse_index_lock = threading.Lock()
+index_loader = None
+index_loader_lock = threading.Lock()
+# Depois de uma falha (ex.: banco ausente) só se volta a tentar ao fim de um
+# intervalo que dobra a cada falha, em vez de uma thread nova por pedido
+INDEX_RETRY_BASE = 30.0
+INDEX_RETRY_MAX = 600.0
+index_failures = 0
+index_retry_at = 0.0
+# None enquanto init_db não verificou se a tabela FTS5 existe
+fts_ready = None
+
+# Como correu o arranque (exposto em /api/ready)
+startup = {"index_source": None, "index_error": None, "timings": {}}
+
+def record_startup(stage, seconds):
+    startup["timings"][f"{stage}_s"] = round(seconds, 3)
+
+# Cache de respostas persistida ao lado do banco da Bíblia
+CACHE_DB_PATH = os.path.join(BASE_DIR, 'cache.sqlite.db')
+answer_cache = AnswerCache(
+    CACHE_DB_PATH,
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    ttl=int(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600))),
+)
+
+if not GEMINI_API_KEY:
+    logger.error("❌ ERRO: GEMINI_API_KEY não encontrada no ficheiro .env")
+
+# O SDK do Gemini demora a importar: só é carregado (e configurado) quando é
+# preciso, ou em segundo plano depois do arranque (ver warm_up)
+_genai = None
+_genai_lock = threading.Lock()
+
+def gemini():
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                start = time.perf_counter()
+                import google.generativeai as genai
+                try:
+                    if GEMINI_API_KEY:
+                        # Configuração do cliente com a biblioteca correta
+                        genai.configure(api_key=GEMINI_API_KEY)
+                        logger.info("✨ Cliente Gemini inicializado com sucesso.")
+                except Exception as e:
+                    logger.error("❌ Erro ao conectar com Google AI: %s", e)
+                record_startup("gemini_import", time.perf_counter() - start)
+                _genai = genai
+    return _genai
 
 # --- LÓGICA DE BANCO DE DADOS (RAG) ---
 
@@ -37,81 +106,248 @@ def get_connection():
     try:
         # Verifica se o ficheiro existe antes de tentar abrir
         if not os.path.exists(DB_PATH):
-            print(f"⚠️ AVISO: Ficheiro de base de dados não encontrado em: {DB_PATH}")
+            logger.warning("⚠️ AVISO: Ficheiro de base de dados não encontrado em: %s", DB_PATH)
             return None
         
         conn = sqlite3.connect(DB_PATH)
         return conn
     except Exception as e:
-        print(f"❌ Erro ao abrir arquivo .db: {e}")
+        logger.error("❌ Erro ao abrir arquivo .db: %s", e)
         return None
 
 def init_db():
-    print(f"🔍 Verificando base de dados em: {DB_PATH}...")
+    # Só verifica: a criação do FTS5 é lenta e passou para o build_index.py
+    global fts_ready
+    start = time.perf_counter()
+    logger.info("🔍 Verificando base de dados em: %s...", DB_PATH)
     conn = get_connection()
     if not conn: 
-        print("❌ Falha crítica: Não foi possível estabelecer conexão com o SQLite.")
+        logger.error("❌ Falha crítica: Não foi possível estabelecer conexão com o SQLite.")
         return
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='full_text_search'")
-        if not cursor.fetchone():
-            print("⚙️ Criando índice de busca nos manuscritos (FTS5)...")
-            cursor.execute("""
-                CREATE VIRTUAL TABLE full_text_search USING fts5(
-                    text, 
-                    content='verse', 
-                    content_rowid='id'
-                );
-            """)
-            cursor.execute("INSERT INTO full_text_search(rowid, text) SELECT id, text FROM verse;")
-            conn.commit()
-            print("✅ Índice FTS5 criado e populado com sucesso.")
+        fts_ready = has_fts_table(conn)
+        if fts_ready:
+            logger.info("✅ Índice de busca já existente e pronto a usar.")
         else:
-            print("✅ Índice de busca já existente e pronto a usar.")
+            logger.warning("⚠️ Índice FTS5 ausente: execute 'python build_index.py'. Até lá só o índice em memória é usado.")
     except sqlite3.Error as e:
-        print(f"❌ Erro ao inicializar tabelas: {e}. Verifique se a tabela 'verse' existe.")
+        logger.error("❌ Erro ao verificar tabelas: %s. Verifique se a tabela 'verse' existe.", e)
     finally:
         conn.close()
-    print("📜 Salomão está pronto para consultar os manuscritos.")
+        record_startup("init_db", time.perf_counter() - start)
+    logger.info("📜 Salomão está pronto para consultar os manuscritos.")
 
-def fetch_relevant_verses(query):
-    conn = get_connection()
+def save_index_artifact(index, source):
+    # Guarda o índice construído para que o próximo arranque seja rápido
+    try:
+        save_index(index, VERSE_INDEX_PATH, source)
+        logger.info("💾 Índice gravado em %s.", VERSE_INDEX_PATH)
+    except OSError as e:
+        logger.warning("⚠️ Não foi possível gravar o índice em %s: %s", VERSE_INDEX_PATH, e)
+
+def index_failed(reason):
+    global index_failures, index_retry_at
+    index_failures += 1
+    delay = min(INDEX_RETRY_BASE * 2 ** (index_failures - 1), INDEX_RETRY_MAX)
+    index_retry_at = time.monotonic() + delay
+    startup["index_error"] = reason
+    logger.error("❌ Índice em memória indisponível (%s). Nova tentativa daqui a %.0fs.", reason, delay)
+
+def load_verse_index():
+    """Carrega o índice (artefato validado ou construção a partir do banco). Bloqueia."""
+    global verse_index, index_failures
+    with verse_index_lock:
+        if verse_index is not None:
+            return verse_index
+        with span("db_acquire"):
+            conn = db_pool.acquire()
+        if not conn:
+            index_failed("sem conexão ao banco")
+            return None
+        start = time.perf_counter()
+        broken = False
+        try:
+            source = source_fingerprint(conn)
+            try:
+                with span("index_load"):
+                    index, header = load_index(VERSE_INDEX_PATH, source)
+                startup["index_source"] = "artifact"
+                logger.info("⚡ Índice pré-construído carregado: %s versículos em %.2fs (criado em %s).",
+                            len(index), time.perf_counter() - start, header.get("created_at"))
+            except InvalidArtifact as e:
+                startup["index_error"] = str(e)
+                logger.warning("⚠️ Índice pré-construído ignorado (%s). A construir a partir do banco...", e)
+                with span("index_build"):
+                    index = VerseIndex.from_connection(conn)
+                startup["index_source"] = "build"
+                logger.info("📚 Índice em memória carregado: %s versículos em %.2fs.",
+                            len(index), time.perf_counter() - start)
+                save_index_artifact(index, source)
+        except sqlite3.Error as e:
+            broken = True
+            index_failed(f"erro do SQLite: {e}")
+            return None
+        except Exception as e:
+            logger.exception("❌ Erro inesperado ao carregar o índice: %s", e)
+            index_failed(str(e))
+            return None
+        finally:
+            db_pool.release(conn, discard=broken)
+        verse_index = index
+        index_failures = 0
+        record_startup("index", time.perf_counter() - start)
+        record_startup("ready", time.perf_counter() - STARTED_AT)
+    return verse_index
+
+def start_index_loader():
+    """Carrega o índice numa thread própria (uma de cada vez). Retorna a thread."""
+    global index_loader
+    with index_loader_lock:
+        retry = verse_index is None and time.monotonic() >= index_retry_at
+        if index_loader is None or (not index_loader.is_alive() and retry):
+            index_loader = threading.Thread(target=load_verse_index, name="indice", daemon=True)
+            index_loader.start()
+        return index_loader
+
+def get_verse_index():
+    """Índice em memória, ou None enquanto carrega (sem bloquear o pedido)."""
+    if verse_index is None:
+        start_index_loader()
+    return verse_index
+
+def warm_up(wait=False):
+    """Arranque: verifica o banco e começa a carregar o índice e o SDK do Gemini.
+
+    Com wait=True (linha de comando) só retorna com o índice carregado.
+    """
+    init_db()
+    loader = start_index_loader()
+
+    def import_gemini():
+        # Depois do índice, para não disputar o CPU com o carregamento
+        loader.join()
+        gemini()
+
+    threading.Thread(target=import_gemini, name="gemini-import", daemon=True).start()
+    if wait:
+        loader.join()
+
+def format_verses(rows):
+    return "\n".join([f"[{r['book']} {r['chapter']}:{r['verse']}]: {r['text']}" for r in rows])
+
+def fetch_relevant_verses(query, limit=5):
+    if not query.strip():
+        return ""
+
+    index = get_verse_index()
+    if index is not None:
+        with span("index_search"):
+            rows = index.search(query, k=limit)
+        with span("verse_format"):
+            return format_verses(rows)
+
+    # Modo degradado (índice ainda a carregar): busca FTS5 diretamente no SQLite
+    if fts_ready is False:
+        return ""
+    with span("db_acquire"):
+        conn = db_pool.acquire()
     if not conn: return None
+    broken = False
     try:
-        cursor = conn.cursor()
-        clean_query = re.sub(r'[^\w\s]', '', query)
-        
-        if not clean_query.strip():
+        match_expression = build_match_expression(query)
+        if not match_expression:
             return ""
 
-        cursor.execute(
-            "SELECT rowid FROM full_text_search WHERE full_text_search MATCH ? LIMIT 5", 
-            (f'"{clean_query}"',)
-        )
-        
-        ids = [row[0] for row in cursor.fetchall()]
-        if not ids: return ""
-
-        placeholders = ','.join('?' * len(ids))
-        query_sql = f"""
-            SELECT T1.text, T2.name AS book, T1.chapter, T1.verse
-            FROM verse T1 JOIN book T2 ON T1.book_id = T2.id
-            WHERE T1.id IN ({placeholders})
-        """
-        cursor.execute(query_sql, ids)
-        results = cursor.fetchall()
-        return "\n".join([f"[{r['book']} {r['chapter']}:{r['verse']}]: {r['text']}" for r in results])
+        # FTS5 MATCH e junção com verse/book numa única consulta (ver database.py)
+        with span("fts_search"):
+            rows = search_verses(conn, match_expression, limit=limit)
+        with span("verse_format"):
+            return format_verses(rows)
     except sqlite3.Error as e:
-        print(f"❌ Erro na busca FTS5: {e}")
+        logger.error("❌ Erro na busca FTS5: %s", e)
+        # A conexão com erro é fechada em vez de voltar ao pool
+        broken = True
         return None
     finally:
-        conn.close()
+        db_pool.release(conn, discard=broken)
+
+def fetch_relevant_verses_batch(queries, limit=5):
+    """Contexto para várias perguntas numa única passagem (índice em memória ou uma só conexão)."""
+    index = get_verse_index()
+    if index is not None:
+        return {q: format_verses(index.search(q, k=limit)) if q.strip() else "" for q in queries}
+    if fts_ready is False:
+        return {q: "" for q in queries}
+
+    contextos = {}
+    try:
+        with db_pool.connection() as conn:
+            if not conn: return {q: None for q in queries}
+            for q in queries:
+                match_expression = build_match_expression(q)
+                contextos[q] = format_verses(search_verses(conn, match_expression, limit=limit)) if match_expression else ""
+    except sqlite3.Error as e:
+        logger.error("❌ Erro na busca FTS5 (lote): %s", e)
+    return {q: contextos.get(q) for q in queries}
 
 # --- LÓGICA DE INTELIGÊNCIA ARTIFICIAL ---
 
-def ask_solomon(user_query, context):
-    prompt = (
+# Controlo de admissão: pedidos simultâneos, fila curta e teto por cliente.
+# Acima disso o pedido é recusado de imediato com 429 + Retry-After.
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_CHATS", "16")),
+    max_queue=int(os.getenv("CHAT_QUEUE_SIZE", "32")),
+    per_client_limit=int(os.getenv("PER_CLIENT_LIMIT", "4")),
+    queue_timeout=float(os.getenv("CHAT_QUEUE_TIMEOUT", "10")),
+)
+
+# Número de proxies reversos de confiança à frente do servidor (0 = ligação direta)
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+# Cota do Gemini (pedidos por minuto) aplicada localmente antes de chamar a API
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+gemini_bucket = TokenBucket(rate=GEMINI_RPM / 60.0, capacity=int(os.getenv("GEMINI_BURST", "5")))
+
+# Lotes (/api/chat/batch e batch.py): chamadas ao Gemini em paralelo e espera máxima pela cota
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_QUOTA_TIMEOUT = float(os.getenv("BATCH_QUOTA_TIMEOUT", "120"))
+# Fichas da cota que os lotes nunca usam, para o chat interativo não levar 429 por causa deles
+BATCH_QUOTA_RESERVE = int(os.getenv("BATCH_QUOTA_RESERVE", str(max(1, gemini_bucket.capacity // 2))))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+
+# Estado instantâneo exposto em /api/metrics (lido só no momento da recolha)
+registry.gauge_callback("salomao_admission_active", "Pedidos de chat em execução.",
+                        lambda: admission.stats()["active"])
+registry.gauge_callback("salomao_admission_waiting", "Pedidos de chat à espera de vaga.",
+                        lambda: admission.stats()["waiting"])
+registry.gauge_callback("salomao_db_open_connections", "Conexões SQLite de leitura abertas.",
+                        lambda: db_pool.stats()["open_connections"])
+registry.gauge_callback("salomao_gemini_quota_available", "Fichas disponíveis na cota local do Gemini.",
+                        lambda: gemini_bucket.stats()["available"])
+registry.gauge_callback("salomao_index_ready", "1 quando o índice em memória está carregado (0 = modo degradado).",
+                        lambda: int(verse_index is not None))
+registry.gauge_callback("salomao_model_circuit_open", "1 se o circuito do modelo estiver aberto.",
+                        lambda: {(("model", name),): int(info["circuit"] == "open")
+                                 for name, info in model_router.stats()["models"].items()})
+
+# Lista de prioridade de modelos: 
+MODELS_TO_TRY = ['gemini-2.5-flash', 'gemini-2.0-flash', 'gemini-1.5-flash']
+
+# Clientes reaproveitados + circuit breaker por modelo. GEMINI_HEDGE_AFTER (segundos)
+# ativa o modo "hedged": se o modelo principal demorar mais do que isso, o seguinte
+# é disparado em paralelo.
+model_router = ModelRouter(
+    MODELS_TO_TRY,
+    client_factory=lambda model_name: gemini().GenerativeModel(model_name),
+    hedge_after=float(os.getenv("GEMINI_HEDGE_AFTER", "0")),
+    # Cada pedido admitido pode ter uma chamada em curso por modelo
+    max_workers=admission.max_concurrent * len(MODELS_TO_TRY),
+    # Fallbacks e hedges também gastam cota local (a 1ª chamada é reservada em answer_question)
+    charge_extra=lambda: not gemini_bucket.try_acquire(),
+)
+
+def build_prompt(user_query, context):
+    return (
         f"Você é Salomão, um conselheiro sábio. Responda a pergunta de forma simples e clara, "
         f"sem linguagem muito formal nem rebuscada. Use uma linguagem coloquial e acessível. "
         f"NÃO use nenhuma formatação com asterísticos ou markdown.\n\n"
@@ -119,77 +355,377 @@ def ask_solomon(user_query, context):
         f"Pergunta: {user_query}\n\nResponda de forma natural, como um conselheiro falando com alguém."
     )
 
-    # Lista de prioridade de modelos: 
-    models_to_try = ['gemini-2.5-flash', 'gemini-2.0-flash', 'gemini-1.5-flash']
+def generation_config():
+    return gemini().types.GenerationConfig(
+        temperature=0.7,
+        max_output_tokens=4048,
+    )
 
-    last_error = None
+def clean_markdown(text):
+    # Remove asterísticos usados para formatação Markdown. Tirar todos os '*'
+    # também funciona pedaço a pedaço, mesmo com um '**' partido entre dois chunks.
+    return text.replace('**', '').replace('*', '')
 
-    for model_name in models_to_try:
-        try:
-            print(f"⚡ Tentando usar modelo: {model_name}...")
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    max_output_tokens=4048,
-                )
-            )
-            print(f"✅ Sucesso com {model_name}")
-            # Remove asterísticos usados para formatação Markdown
-            clean_response = response.text.replace('**', '').replace('*', '')
-            return clean_response, None
+def api_error(last_error):
+    if "429" in str(last_error):
+        return "LIMITE_EXCEDIDO"
+    return f"ERRO_API: Não foi possível conectar a nenhum modelo. Último erro: {last_error}"
 
-        except Exception as e:
-            error_msg = str(e)
-            last_error = error_msg
-            print(f"⚠️ Modelo {model_name} não disponível: {error_msg}")
-            continue
+def ask_solomon(user_query, context):
+    with span("prompt_build"):
+        prompt = build_prompt(user_query, context)
+
+    text, model_name, last_error = model_router.generate(prompt, generation_config())
+    if text is not None:
+        return clean_markdown(text), None
+
+    # Falhou em todos os modelos (ou todos estão com o circuito aberto)
+    return None, api_error(last_error)
+
+def stream_solomon(user_query, context):
+    """Gera eventos ("token", texto) à medida que o Gemini responde; termina com ("error", erro) se falhar."""
+    with span("prompt_build"):
+        prompt = build_prompt(user_query, context)
+
+    for kind, value in model_router.stream(prompt, generation_config()):
+        if kind == "token":
+            text = clean_markdown(value)
+            if text:
+                yield "token", text
+        else:
+            yield "error", api_error(value)
 
-    # Se saiu do loop sem retornar, falhou em todos
-    if "429" in str(last_error):
-        return None, "LIMITE_EXCEDIDO"
-    
-    return None, f"ERRO_API: Não foi possível conectar a nenhum modelo. Último erro: {last_error}"
 # --- ROTAS DA API ---
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    print(f"📩 Pedido recebido: {request.get_json()}")
-    try:
-        # Verifica se o corpo da requisição é JSON
-        if not request.is_json:
-            return jsonify({"answer": "Erro: O servidor esperava um JSON.", "source": "Client Error"}), 400
-            
-        data = request.get_json()
-        pergunta = data.get('query', '')
-        
-        if not pergunta:
-            return jsonify({"answer": "O que desejas saber, meu filho?"}), 400
+def format_source(contexto):
+    return "Fontes: " + contexto.replace('\n', ' | ') if contexto else "Conhecimento geral."
 
-        contexto = fetch_relevant_verses(pergunta)
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def rejected_response(rejeicao):
+    RATE_LIMITED.inc(source=rejeicao.source)
+    return (
+        {"answer": "Estou meditando... Por favor, aguarde um minuto.", "source": "Servidor ocupado", "reason": rejeicao.reason},
+        429,
+        {"Retry-After": str(rejeicao.retry_after)},
+    )
+
+def reserve_gemini_quota(timeout=0):
+    # Consome uma ficha da cota local do Gemini; levanta Rejected se estiver esgotada.
+    # Com timeout (lotes), espera pela próxima ficha em vez de recusar de imediato,
+    # mas com prioridade baixa: deixa BATCH_QUOTA_RESERVE fichas para o chat.
+    if timeout:
+        if not gemini_bucket.acquire(timeout, reserve=BATCH_QUOTA_RESERVE):
+            raise Rejected("Cota do Gemini esgotada localmente.", timeout, source="quota")
+        return
+    espera = gemini_bucket.try_acquire()
+    if espera:
+        raise Rejected("Cota do Gemini esgotada localmente.", espera, source="quota")
+
+def parse_chat_request(data, route="chat"):
+    """Retorna (pergunta, None) ou (None, (payload, status)) se o pedido for inválido."""
+    if data is None:
+        ERRORS.inc(route=route, type="invalid_request")
+        return None, ({"answer": "Erro: O servidor esperava um JSON.", "source": "Client Error"}, 400)
+    pergunta = data.get('query', '') if isinstance(data, dict) else ''
+    if not isinstance(pergunta, str) or not pergunta.strip():
+        ERRORS.inc(route=route, type="invalid_request")
+        return None, ({"answer": "O que desejas saber, meu filho?"}, 400)
+    return pergunta, None
+
+def answer_question(pergunta, contexto=None, quota_timeout=0, route="chat"):
+    """Fluxo completo de /api/chat. Retorna (payload, status, cabeçalhos).
+
+    contexto pode vir já calculado (lotes); quota_timeout > 0 espera pela cota local.
+    """
+    REQUESTS.inc(route=route)
+    start = time.perf_counter()
+    try:
+        if contexto is None:
+            contexto = fetch_relevant_verses(pergunta)
         if contexto is None:
+            ERRORS.inc(route=route, type="retrieval")
             contexto = ""
+        observe_context(contexto)
+
+        fonte = format_source(contexto)
+
+        with span("cache_lookup"):
+            resposta = answer_cache.get(pergunta, contexto)
+        CACHE_LOOKUPS.inc(result="miss" if resposta is None else "hit")
+        if resposta is not None:
+            return {"answer": resposta, "source": fonte, "cached": True}, 200, {}
+
+        try:
+            reserve_gemini_quota(quota_timeout)
+        except Rejected as rejeicao:
+            ERRORS.inc(route=route, type="quota")
+            return rejected_response(rejeicao)
 
         resposta, erro = ask_solomon(pergunta, contexto)
         
         if erro == "LIMITE_EXCEDIDO":
-            return jsonify({"answer": "Estou meditando... Por favor, aguarde um minuto.", "source": "Cota Google"}), 429
+            ERRORS.inc(route=route, type="rate_limited")
+            RATE_LIMITED.inc(source="gemini")
+            return {"answer": "Estou meditando... Por favor, aguarde um minuto.", "source": "Cota Google"}, 429, {"Retry-After": "60"}
         elif erro:
-            print(f"❌ ERRO DETECTADO: {erro}")
-            return jsonify({"answer": f"Erro na IA: {erro}", "source": "Debug"}), 500
+            ERRORS.inc(route=route, type="api_error")
+            logger.error("❌ ERRO DETECTADO: %s", erro)
+            return {"answer": f"Erro na IA: {erro}", "source": "Debug"}, 500, {}
 
-        return jsonify({
+        answer_cache.put(pergunta, contexto, resposta)
+        return {
             "answer": resposta,
-            "source": "Fontes: " + contexto.replace('\n', ' | ') if contexto else "Conhecimento geral."
-        })
+            "source": fonte
+        }, 200, {}
+    except Exception:
+        ERRORS.inc(route=route, type="internal")
+        raise
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route=route)
+
+def stream_answer(pergunta):
+    """Fluxo de /api/chat/stream como eventos SSE: "sources", vários "token" e "done" (ou "error")."""
+    REQUESTS.inc(route="stream")
+    start = time.perf_counter()
+    try:
+        contexto = fetch_relevant_verses(pergunta)
+        if contexto is None:
+            ERRORS.inc(route="stream", type="retrieval")
+            contexto = ""
+        observe_context(contexto)
+        yield sse_event("sources", {"source": format_source(contexto)})
+
+        with span("cache_lookup"):
+            resposta = answer_cache.get(pergunta, contexto)
+        CACHE_LOOKUPS.inc(result="miss" if resposta is None else "hit")
+        if resposta is not None:
+            yield sse_event("token", {"text": resposta})
+            yield sse_event("done", {"cached": True})
+            return
+
+        try:
+            reserve_gemini_quota()
+        except Rejected as rejeicao:
+            ERRORS.inc(route="stream", type="quota")
+            payload, status, _ = rejected_response(rejeicao)
+            yield sse_event("error", {**payload, "status": status, "retry_after": rejeicao.retry_after})
+            return
+
+        partes = []
+        for tipo, valor in stream_solomon(pergunta, contexto):
+            if tipo == "token":
+                partes.append(valor)
+                yield sse_event("token", {"text": valor})
+            elif valor == "LIMITE_EXCEDIDO":
+                ERRORS.inc(route="stream", type="rate_limited")
+                RATE_LIMITED.inc(source="gemini")
+                yield sse_event("error", {"answer": "Estou meditando... Por favor, aguarde um minuto.", "source": "Cota Google", "status": 429})
+                return
+            else:
+                ERRORS.inc(route="stream", type="api_error")
+                logger.error("❌ ERRO DETECTADO: %s", valor)
+                yield sse_event("error", {"answer": f"Erro na IA: {valor}", "source": "Debug", "status": 500})
+                return
+
+        if partes:
+            answer_cache.put(pergunta, contexto, "".join(partes))
+        yield sse_event("done", {"cached": False})
+    except Exception as e:
+        ERRORS.inc(route="stream", type="internal")
+        logger.exception("❌ Erro interno (stream): %s", e)
+        yield sse_event("error", {"answer": "Erro interno no servidor.", "error": str(e), "status": 500})
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route="stream")
+
+def answer_batch(perguntas, workers=BATCH_WORKERS):
+    """Responde a várias perguntas; gera um dict por pergunta, na ordem de entrada.
+
+    Perguntas iguais depois de normalizadas são respondidas uma única vez, o contexto
+    de todas é obtido numa só passagem e as chamadas ao Gemini passam por um pool limitado.
+    """
+    # Chave normalizada -> primeira forma original vista (usada na busca e no prompt)
+    unicas = {}
+    for pergunta in perguntas:
+        if isinstance(pergunta, str) and pergunta.strip():
+            unicas.setdefault(normalize_query(pergunta), pergunta)
+
+    contextos = fetch_relevant_verses_batch(list(unicas.values()))
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="lote")
+    try:
+        futuros = {
+            chave: pool.submit(answer_question, pergunta, contextos.get(pergunta) or "", BATCH_QUOTA_TIMEOUT, "batch")
+            for chave, pergunta in unicas.items()
+        }
+        for i, pergunta in enumerate(perguntas):
+            if not isinstance(pergunta, str) or not pergunta.strip():
+                yield {"index": i, "query": pergunta, "status": 400, "answer": "O que desejas saber, meu filho?"}
+                continue
+            try:
+                payload, status, _ = futuros[normalize_query(pergunta)].result()
+            except Exception as e:
+                logger.exception("❌ Erro interno (lote): %s", e)
+                payload, status = {"answer": "Erro interno no servidor.", "error": str(e)}, 500
+            yield {"index": i, "query": pergunta, "status": status, **payload}
+    finally:
+        # Se o cliente desistir a meio, as perguntas ainda na fila não chegam ao Gemini
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def client_id(headers, remote_addr):
+    # X-Forwarded-For só conta quando há proxies nossos à frente (TRUSTED_PROXIES):
+    # usa-se o IP acrescentado pelo mais externo deles, como o ProxyFix do werkzeug.
+    # Sem proxy configurado o cabeçalho é ignorado (o cliente poderia inventá-lo).
+    if TRUSTED_PROXIES:
+        forwarded = [ip.strip() for ip in headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+        if len(forwarded) >= TRUSTED_PROXIES:
+            return forwarded[-TRUSTED_PROXIES]
+    return remote_addr or 'anon'
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    logger.debug("📩 Pedido recebido de %s (%s bytes)", request.remote_addr, request.content_length)
+    try:
+        # Verifica se o corpo da requisição é JSON
+        pergunta, invalido = parse_chat_request(request.get_json(silent=True) if request.is_json else None)
+        if invalido:
+            return jsonify(invalido[0]), invalido[1]
+
+        try:
+            ticket = admission.acquire(client_id(request.headers, request.remote_addr))
+        except Rejected as rejeicao:
+            payload, status, headers = rejected_response(rejeicao)
+            return jsonify(payload), status, headers
+
+        try:
+            payload, status, headers = answer_question(pergunta)
+        finally:
+            admission.release(ticket)
+        return jsonify(payload), status, headers
     except Exception as e:
-        print(f"❌ Erro interno: {e}")
+        logger.exception("❌ Erro interno: %s", e)
         return jsonify({"answer": "Erro interno no servidor.", "error": str(e)}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    # Mesmo contrato de /api/chat, mas a resposta chega como Server-Sent Events
+    pergunta, invalido = parse_chat_request(request.get_json(silent=True) if request.is_json else None, route="stream")
+    if invalido:
+        return jsonify(invalido[0]), invalido[1]
+
+    try:
+        ticket = admission.acquire(client_id(request.headers, request.remote_addr))
+    except Rejected as rejeicao:
+        payload, status, headers = rejected_response(rejeicao)
+        return jsonify(payload), status, headers
+
+    response = Response(
+        stream_with_context(stream_answer(pergunta)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # A vaga fica ocupada até o stream terminar (ou o cliente desligar)
+    response.call_on_close(lambda: admission.release(ticket))
+    return response
+
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    # {"queries": ["...", "..."]} -> uma linha JSON por pergunta (application/x-ndjson)
+    data = request.get_json(silent=True) if request.is_json else None
+    perguntas = data.get('queries') if isinstance(data, dict) else None
+    if not isinstance(perguntas, list) or not perguntas:
+        return jsonify({"error": "Envie um JSON com a lista 'queries'."}), 400
+    if len(perguntas) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"No máximo {MAX_BATCH_SIZE} perguntas por lote."}), 413
+
+    try:
+        ticket = admission.acquire(client_id(request.headers, request.remote_addr))
+    except Rejected as rejeicao:
+        payload, status, headers = rejected_response(rejeicao)
+        return jsonify(payload), status, headers
+
+    def generate():
+        for resultado in answer_batch(perguntas):
+            yield json.dumps(resultado, ensure_ascii=False) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(lambda: admission.release(ticket))
+    return response
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    # Formato de exposição de texto do Prometheus
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    stats = db_pool.stats()
+    status = "ok" if stats["db_exists"] else "degraded"
+    return jsonify({
+        "status": status,
+        "database": stats,
+        "search_index": verse_index.stats() if verse_index is not None else None,
+        "answer_cache": answer_cache.stats(),
+        "models": model_router.stats(),
+        "admission": admission.stats(),
+        "gemini_quota": gemini_bucket.stats(),
+    })
+
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    # 200 só com o índice completo; em modo degradado o chat responde, mas aqui é 503
+    index = get_verse_index()
+    if index is not None:
+        search = "bm25"
+    else:
+        search = "fts5" if fts_ready is not False else "none"
+    return jsonify({
+        "status": "ready" if index is not None else "loading",
+        "search": search,
+        "index": {
+            "path": VERSE_INDEX_PATH,
+            "source": startup["index_source"],
+            "error": startup["index_error"],
+            "failures": index_failures,
+        },
+        "startup": startup["timings"],
+        "uptime_s": round(time.perf_counter() - STARTED_AT, 3),
+    }), 200 if index is not None else 503
+
+
+def is_admin_request():
+    # Comparação em tempo constante para não revelar o token por temporização
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+@app.route('/api/admin/cache', methods=['GET', 'DELETE'])
+def admin_cache():
+    if not is_admin_request():
+        return jsonify({"error": "Acesso negado."}), 403
+
+    if request.method == 'GET':
+        return jsonify(answer_cache.stats())
+
+    # DELETE com {"query": "..."} remove só essa pergunta; sem corpo limpa tudo
+    data = request.get_json(silent=True) or {}
+    pergunta = data.get('query') if isinstance(data, dict) else None
+    if not isinstance(data, dict) or not (pergunta is None or isinstance(pergunta, str)):
+        return jsonify({"error": "Envie {\"query\": \"...\"} ou um corpo vazio."}), 400
+    removidas = answer_cache.invalidate(pergunta)
+    logger.info("🧹 Cache invalidada: %s entrada(s) removida(s).", removidas)
+    return jsonify({"removed": removidas, "stats": answer_cache.stats()})
+
+
+record_startup("import", time.perf_counter() - STARTED_AT)
 
 if __name__ == '__main__':
-    print("🚀 A iniciar o servidor de sabedoria...")
-    init_db()
+    logger.info("🚀 A iniciar o servidor de sabedoria...")
+    # O índice carrega em segundo plano: o servidor aceita pedidos de imediato
+    warm_up()
     # O host '0.0.0.0' ajuda a evitar bloqueios em alguns sistemas
     app.run(debug=True, port=5000, host='0.0.0.0') 
\ No newline at end of file
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as salomao
+from admission import Rejected
+
+# --- MODO DE SERVIÇO ASSÍNCRONO (ASGI) ---
+#
+# As rotas de chat são tratadas aqui com asyncio: pedidos à espera de vaga são
+# apenas corrotinas (não prendem uma thread) e o trabalho bloqueante (SQLite e
+# Gemini) corre num pool limitado ao número de vagas do controlo de admissão.
+# As restantes rotas continuam a ser servidas pelo Flask.
+#
+# Uso: uvicorn asgi:application --host 0.0.0.0 --port 5000   (ou: python asgi.py)
+
+logger = logging.getLogger("salomao.asgi")
+
+flask_app = WsgiToAsgi(salomao.app)
+
+# Folga para o carregamento do índice e pedidos sem Gemini (respostas em cache)
+executor = ThreadPoolExecutor(
+    max_workers=salomao.admission.max_concurrent + 4,
+    thread_name_prefix="salomao",
+)
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+
+def request_headers(scope):
+    return {k.decode("latin-1").title(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status, payload, headers=None):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    extra = [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in (headers or {}).items()]
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), *CORS_HEADERS, *extra],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def parse_body(headers, body):
+    if not headers.get("Content-Type", "").startswith("application/json"):
+        return None
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        return None
+
+
+async def chat(scope, receive, send):
+    body = await read_body(receive)
+    if body is None:
+        return
+    headers = request_headers(scope)
+    pergunta, invalido = salomao.parse_chat_request(parse_body(headers, body))
+    if invalido:
+        await send_json(send, invalido[1], invalido[0])
+        return
+
+    client = salomao.client_id(headers, (scope.get("client") or ("anon",))[0])
+    loop = asyncio.get_running_loop()
+    try:
+        async with salomao.admission.async_slot(client):
+            payload, status, extra = await loop.run_in_executor(executor, salomao.answer_question, pergunta)
+    except Rejected as rejeicao:
+        payload, status, extra = salomao.rejected_response(rejeicao)
+    except Exception as e:
+        # Mesmo contrato da rota Flask: JSON em vez de um 500 vazio do servidor ASGI
+        logger.exception("❌ Erro interno: %s", e)
+        payload, status, extra = {"answer": "Erro interno no servidor.", "error": str(e)}, 500, {}
+    await send_json(send, status, payload, extra)
+
+
+async def chat_stream(scope, receive, send):
+    body = await read_body(receive)
+    if body is None:
+        return
+    headers = request_headers(scope)
+    pergunta, invalido = salomao.parse_chat_request(parse_body(headers, body), route="stream")
+    if invalido:
+        await send_json(send, invalido[1], invalido[0])
+        return
+
+    client = salomao.client_id(headers, (scope.get("client") or ("anon",))[0])
+    try:
+        ticket = await salomao.admission.acquire_async(client)
+    except Rejected as rejeicao:
+        payload, status, extra = salomao.rejected_response(rejeicao)
+        await send_json(send, status, payload, extra)
+        return
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    stop = threading.Event()
+
+    def pump():
+        # Corre o gerador síncrono numa thread e entrega cada evento ao loop
+        generator = salomao.stream_answer(pergunta)
+        try:
+            for event in generator:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(events.put_nowait, event)
+        finally:
+            generator.close()
+            loop.call_soon_threadsafe(events.put_nowait, None)
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        stop.set()
+        events.put_nowait(None)
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+                *CORS_HEADERS,
+            ],
+        })
+        worker = loop.run_in_executor(executor, pump)
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+        if not stop.is_set():
+            await send({"type": "http.response.body", "body": b""})
+        stop.set()
+        await worker
+    finally:
+        stop.set()
+        watcher.cancel()
+        salomao.admission.release(ticket)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Só a verificação do banco; o índice carrega em segundo plano (ver /api/ready)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(executor, salomao.warm_up)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+ROUTES = {
+    "/api/chat": chat,
+    "/api/chat/stream": chat_stream,
+}
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    handler = ROUTES.get(scope.get("path")) if scope["type"] == "http" else None
+    if handler is not None and scope.get("method") == "POST":
+        await handler(scope, receive, send)
+        return
+    # Preflight CORS, health, admin, etc.
+    await flask_app(scope, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logger.info("🚀 A iniciar o servidor de sabedoria (modo assíncrono)...")
+    uvicorn.run(application, host='0.0.0.0', port=int(os.getenv("PORT", "5000")))
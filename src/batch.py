@@ -0,0 +1,59 @@
+import argparse
+import json
+import sys
+
+import app as salomao
+
+# --- RESPOSTAS EM LOTE PELA LINHA DE COMANDO ---
+#
+# Uso:
+#   python batch.py perguntas.txt > respostas.jsonl      (uma pergunta por linha)
+#   cat perguntas.txt | python batch.py --workers 8 -o respostas.jsonl
+#
+# Cada linha de saída é um objeto JSON com index, query, status e answer/source,
+# na mesma ordem das perguntas de entrada.
+
+
+def read_questions(stream):
+    return [line.strip() for line in stream if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Responde a uma lista de perguntas com o Salomão (JSON Lines).")
+    parser.add_argument("input", nargs="?", help="ficheiro com uma pergunta por linha (padrão: stdin)")
+    parser.add_argument("-o", "--output", help="ficheiro de saída .jsonl (padrão: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=salomao.BATCH_WORKERS,
+                        help="chamadas simultâneas ao Gemini")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            perguntas = read_questions(f)
+    else:
+        perguntas = read_questions(sys.stdin)
+
+    if not perguntas:
+        print("⚠️ Nenhuma pergunta recebida.", file=sys.stderr)
+        return 1
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    falhas = 0
+    try:
+        # Os logs do servidor vão para stderr, por isso o stdout fica só com o JSON Lines
+        # Em lote vale a pena esperar pelo índice completo em vez do modo degradado
+        salomao.warm_up(wait=True)
+        for resultado in salomao.answer_batch(perguntas, workers=args.workers):
+            if resultado["status"] != 200:
+                falhas += 1
+            out.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"📦 Lote concluído: {len(perguntas)} pergunta(s), {falhas} com erro.", file=sys.stderr)
+    return 0 if falhas == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from database import compute_fingerprint, create_fts_index, has_fts_table, store_fingerprint
+from index_artifact import InvalidArtifact, load_index, save_index
+from retrieval import VerseIndex
+
+# --- CONSTRUÇÃO OFFLINE DOS ÍNDICES DE BUSCA ---
+#
+# Corre uma vez por versão do banco (ex.: no build da imagem/deploy), nunca no arranque:
+#   python build_index.py                 (cria o FTS5 se faltar, grava o hash do conteúdo no banco e o NVI.index)
+#   python build_index.py --check         (só valida o NVI.index existente contra o banco)
+#
+# O servidor carrega o NVI.index em milissegundos; se faltar ou não corresponder
+# ao banco, constrói o índice em segundo plano e responde em modo degradado.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'NVI.sqlite.db')
+DEFAULT_INDEX_PATH = os.getenv("VERSE_INDEX_PATH", os.path.join(BASE_DIR, 'NVI.index'))
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Constrói os índices de busca do Salomão (FTS5 + BM25).")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="banco da Bíblia (padrão: src/NVI.sqlite.db)")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH, help="ficheiro do índice (padrão: src/NVI.index)")
+    parser.add_argument("--check", action="store_true", help="apenas valida o índice existente")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        log(f"❌ Banco não encontrado em: {args.db}")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        # Sempre recalculado aqui, a partir do conteúdo atual de book/verse
+        source = compute_fingerprint(conn)
+
+        if args.check:
+            try:
+                index, header = load_index(args.output, source)
+            except InvalidArtifact as e:
+                log(f"❌ Índice inválido: {e}")
+                return 2
+            log(f"✅ Índice válido ({len(index)} versículos, criado em {header.get('created_at')}).")
+            return 0
+
+        if not has_fts_table(conn):
+            log("⚙️ Criando índice de busca nos manuscritos (FTS5)...")
+            start = time.perf_counter()
+            create_fts_index(conn)
+            log(f"✅ Índice FTS5 criado em {time.perf_counter() - start:.2f}s.")
+        else:
+            log("✅ Índice FTS5 já existente.")
+
+        store_fingerprint(conn, source)
+
+        start = time.perf_counter()
+        index = VerseIndex.from_connection(conn)
+        header = save_index(index, args.output, source)
+        log(f"📚 Índice BM25 gravado em {args.output}: {header['stats']['verses']} versículos, "
+            f"{header['stats']['terms']} termos em {time.perf_counter() - start:.2f}s "
+            f"(sha256 {header['sha256'][:12]}).")
+    except sqlite3.Error as e:
+        log(f"❌ Erro ao ler o banco: {e}. Verifique se as tabelas 'verse' e 'book' existem.")
+        return 1
+    finally:
+        conn.close()
+
+    # Confirma que o ficheiro gravado é aceite pelo servidor
+    try:
+        start = time.perf_counter()
+        load_index(args.output, source)
+    except InvalidArtifact as e:
+        log(f"❌ O índice gravado não passou na validação: {e}")
+        return 2
+    log(f"⚡ Validação OK: carregamento em {time.perf_counter() - start:.3f}s.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from retrieval import fold
+
+# --- CACHE DE RESPOSTAS (LRU EM MEMÓRIA + SQLITE) ---
+
+logger = logging.getLogger("salomao.cache")
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# A cada quantas gravações as entradas expiradas são apagadas do disco
+PRUNE_EVERY = 256
+# Espera máxima por um lock do SQLite: tudo passa por self._lock, então um
+# bloqueio longo noutro processo não pode parar todos os pedidos de chat
+BUSY_TIMEOUT_SECONDS = 0.5
+
+
+def normalize_query(query):
+    """'  O que é Graça?? ' -> 'o que e graca'"""
+    return " ".join(re.sub(r"[^\w\s]", " ", fold(query)).split())
+
+
+def make_key(query, context):
+    context_hash = hashlib.sha256((context or "").encode("utf-8")).hexdigest()
+    raw = f"{normalize_query(query)}\0{context_hash}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """Cache de respostas do Gemini indexada pela pergunta normalizada + hash do contexto.
+
+    As entradas ficam numa LRU limitada em memória e são persistidas numa tabela
+    SQLite para sobreviver a reinícios do servidor.
+    """
+
+    def __init__(self, db_path, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "invalidations": 0,
+            "pruned": 0,
+        }
+
+    def _connection(self):
+        # Chamado sempre com self._lock adquirido
+        if self._conn is None:
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = NORMAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS answer_cache (
+                        key TEXT PRIMARY KEY,
+                        query TEXT NOT NULL,
+                        answer TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS answer_cache_query ON answer_cache(query)")
+                conn.execute("CREATE INDEX IF NOT EXISTS answer_cache_created_at ON answer_cache(created_at)")
+                conn.commit()
+                self._conn = conn
+                # Limpa o que expirou enquanto o servidor esteve parado
+                self._prune(conn)
+            except sqlite3.Error as e:
+                logger.warning("⚠️ Cache persistente indisponível (%s): %s", self.db_path, e)
+                return None
+        return self._conn
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _prune(self, conn):
+        # Chamado sempre com self._lock adquirido
+        if self.ttl is None:
+            return
+        try:
+            removed = conn.execute(
+                "DELETE FROM answer_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Erro ao limpar cache persistente: %s", e)
+            return
+        self._stats["pruned"] += removed
+        if removed:
+            logger.info("🧹 Cache: %s entrada(s) expirada(s) removida(s) do disco.", removed)
+
+    @staticmethod
+    def _rollback(conn):
+        # Desfaz a transação deixada aberta por um comando que falhou (ex.: banco bloqueado)
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def get(self, query, context):
+        key = make_key(query, context)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                answer, created_at, _ = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return answer
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT answer, created_at, query FROM answer_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning("⚠️ Erro ao ler cache persistente: %s", e)
+                    row = None
+                if row is not None:
+                    answer, created_at, normalized = row
+                    if not self._expired(created_at):
+                        self._remember(key, (answer, created_at, normalized))
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return answer
+                    self._stats["expired"] += 1
+                    try:
+                        conn.execute("DELETE FROM answer_cache WHERE key = ?", (key,))
+                        conn.commit()
+                    except sqlite3.Error as e:
+                        # Fica para o próximo _prune; o pedido segue como miss
+                        logger.warning("⚠️ Erro ao apagar entrada expirada da cache: %s", e)
+                        self._rollback(conn)
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, query, context, answer):
+        key = make_key(query, context)
+        normalized = normalize_query(query)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, (answer, created_at, normalized))
+            self._stats["stores"] += 1
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO answer_cache(key, query, answer, created_at) VALUES (?, ?, ?, ?)",
+                    (key, normalized, answer, created_at),
+                )
+                conn.commit()
+                if self._stats["stores"] % PRUNE_EVERY == 0:
+                    self._prune(conn)
+            except sqlite3.Error as e:
+                logger.warning("⚠️ Erro ao gravar cache persistente: %s", e)
+                self._rollback(conn)
+
+    def invalidate(self, query=None):
+        """Remove as entradas de uma pergunta (todas as variantes de contexto) ou a cache inteira.
+
+        Retorna o número de entradas removidas (do disco, ou da memória se o disco estiver indisponível).
+        """
+        with self._lock:
+            conn = self._connection()
+            if query is None:
+                removed = len(self._memory)
+                self._memory.clear()
+                sql, params = "DELETE FROM answer_cache", ()
+            else:
+                normalized = normalize_query(query)
+                keys = [k for k, entry in self._memory.items() if entry[2] == normalized]
+                for key in keys:
+                    del self._memory[key]
+                removed = len(keys)
+                sql, params = "DELETE FROM answer_cache WHERE query = ?", (normalized,)
+            if conn is not None:
+                try:
+                    removed = conn.execute(sql, params).rowcount
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning("⚠️ Erro ao invalidar cache persistente: %s", e)
+                    self._rollback(conn)
+            self._stats["invalidations"] += 1
+            return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
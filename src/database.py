@@ -0,0 +1,248 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+# --- POOL DE CONEXÕES SOMENTE-LEITURA (NVI) ---
+
+logger = logging.getLogger("salomao.database")
+
+# Pragmas aplicados a cada conexão de leitura. O banco da Bíblia não muda em
+# tempo de execução, então podemos mapear o ficheiro em memória e usar uma
+# cache de páginas generosa.
+MMAP_SIZE = 256 * 1024 * 1024      # 256 MiB
+CACHE_SIZE_KIB = 64 * 1024         # 64 MiB (valor negativo no PRAGMA = KiB)
+STATEMENT_CACHE = 64
+
+# As consultas são constantes de módulo: o sqlite3 reaproveita o statement já
+# preparado sempre que recebe exatamente o mesmo texto SQL na mesma conexão.
+SQL_SEARCH_VERSES = """
+    SELECT v.text AS text, b.name AS book, v.chapter AS chapter, v.verse AS verse
+    FROM full_text_search
+    JOIN verse v ON v.id = full_text_search.rowid
+    JOIN book b ON b.id = v.book_id
+    WHERE full_text_search MATCH ?
+    ORDER BY full_text_search.rank
+    LIMIT ?
+"""
+
+
+def build_readonly_uri(path, immutable=True):
+    uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+    if immutable:
+        # immutable=1 desliga locks e verificações de alteração do ficheiro
+        uri += "&immutable=1"
+    return uri
+
+
+class ConnectionPool:
+    """Pool limitado de conexões somente-leitura: cada pedido pede uma e devolve-a.
+
+    No máximo `size` conexões existem ao mesmo tempo; as livres ficam numa fila
+    e são reaproveitadas pelo próximo pedido, seja qual for a thread.
+    """
+
+    def __init__(self, db_path, size=8, immutable=True, timeout=5.0):
+        self.db_path = db_path
+        self.size = size
+        self.immutable = immutable
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._open = 0
+        self._closed = False
+        self._stats = {
+            "opened": 0,
+            "acquired": 0,
+            "failures": 0,
+            "timeouts": 0,
+        }
+        self._created_at = time.time()
+
+    def _open_connection(self):
+        conn = sqlite3.connect(
+            build_readonly_uri(self.db_path, self.immutable),
+            uri=True,
+            cached_statements=STATEMENT_CACHE,
+            # A conexão passa de thread em thread, mas só uma a usa de cada vez
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _fail(self):
+        with self._lock:
+            self._stats["failures"] += 1
+        self._slots.release()
+
+    def acquire(self, timeout=None):
+        """Retira uma conexão do pool (esperando até timeout se estiverem todas em uso).
+
+        Retorna None se o ficheiro não existir, não puder ser aberto ou o tempo esgotar.
+        Toda a conexão obtida tem de voltar com release().
+        """
+        if not self._slots.acquire(timeout=self.timeout if timeout is None else timeout):
+            logger.warning("⚠️ Todas as %s conexões SQLite estão em uso.", self.size)
+            with self._lock:
+                self._stats["timeouts"] += 1
+            return None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            if not os.path.exists(self.db_path):
+                logger.warning("⚠️ AVISO: Ficheiro de base de dados não encontrado em: %s", self.db_path)
+                self._fail()
+                return None
+            try:
+                conn = self._open_connection()
+            except sqlite3.Error as e:
+                logger.error("❌ Erro ao abrir arquivo .db: %s", e)
+                self._fail()
+                return None
+            with self._lock:
+                self._open += 1
+                self._stats["opened"] += 1
+        with self._lock:
+            self._stats["acquired"] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """Devolve a conexão ao pool; discard=True fecha-a (ex.: depois de um erro do SQLite)."""
+        if discard or self._closed:
+            self._close(conn)
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except sqlite3.Error:
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                self.release(conn, discard=broken)
+
+    def _close(self, conn):
+        with self._lock:
+            self._open -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Fecha as conexões livres; as que estão em uso fecham-se ao ser devolvidas."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "db_exists": os.path.exists(self.db_path),
+                "immutable": self.immutable,
+                "size": self.size,
+                "open_connections": self._open,
+                "idle_connections": self._idle.qsize(),
+                "opened": self._stats["opened"],
+                "acquired": self._stats["acquired"],
+                "failures": self._stats["failures"],
+                "timeouts": self._stats["timeouts"],
+                "mmap_size": MMAP_SIZE,
+                "cache_size_kib": CACHE_SIZE_KIB,
+                "uptime_s": round(time.time() - self._created_at, 1),
+            }
+
+
+def search_verses(conn, match_expression, limit=5):
+    """Busca FTS5 + junção com verse/book numa única ida ao banco, já ordenada por relevância."""
+    cursor = conn.execute(SQL_SEARCH_VERSES, (match_expression, limit))
+    return cursor.fetchall()
+
+
+# --- ÍNDICE FTS5 E IDENTIFICAÇÃO DO CONTEÚDO ---
+
+SQL_HAS_FTS = "SELECT name FROM sqlite_master WHERE type='table' AND name='full_text_search'"
+
+# Identificação do conteúdo de book/verse: os índices pré-construídos só são
+# aceites se vierem exatamente do mesmo conteúdo. O build_index.py calcula o hash
+# uma vez e grava-o no próprio banco; no arranque basta lê-lo.
+SQL_CREATE_META = """
+    CREATE TABLE IF NOT EXISTS search_index_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+"""
+SQL_READ_FINGERPRINT = "SELECT value FROM search_index_meta WHERE key = 'source_fingerprint'"
+
+
+def has_fts_table(conn):
+    return conn.execute(SQL_HAS_FTS).fetchone() is not None
+
+
+def create_fts_index(conn):
+    """Cria e popula a tabela FTS5 (operação lenta: corre no build, não no arranque)."""
+    conn.execute("""
+        CREATE VIRTUAL TABLE full_text_search USING fts5(
+            text, 
+            content='verse', 
+            content_rowid='id'
+        );
+    """)
+    conn.execute("INSERT INTO full_text_search(rowid, text) SELECT id, text FROM verse;")
+    conn.commit()
+
+
+def compute_fingerprint(conn):
+    """SHA-256 de todos os livros e versículos (lê as tabelas inteiras)."""
+    digest = hashlib.sha256()
+    books = 0
+    for book_id, name in conn.execute("SELECT id, name FROM book ORDER BY id"):
+        digest.update(f"{book_id}\x1f{name}\x1e".encode("utf-8"))
+        books += 1
+    verses = 0
+    for row in conn.execute("SELECT id, book_id, chapter, verse, text FROM verse ORDER BY id"):
+        digest.update(("\x1f".join(map(str, row)) + "\x1e").encode("utf-8"))
+        verses += 1
+    return {"books": books, "verses": verses, "content_sha256": digest.hexdigest()}
+
+
+def store_fingerprint(conn, fingerprint):
+    conn.execute(SQL_CREATE_META)
+    conn.execute(
+        "INSERT OR REPLACE INTO search_index_meta(key, value) VALUES ('source_fingerprint', ?)",
+        (json.dumps(fingerprint),),
+    )
+    conn.commit()
+
+
+def source_fingerprint(conn):
+    """Hash gravado pelo build_index.py; se o banco nunca passou pelo build, calcula-o agora."""
+    try:
+        row = conn.execute(SQL_READ_FINGERPRINT).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if row is not None:
+        return json.loads(row[0])
+    return compute_fingerprint(conn)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+from retrieval import ANALYZER_VERSION, VerseIndex
+
+# --- ÍNDICE PRÉ-CONSTRUÍDO (ARTEFATO VERSIONADO) ---
+#
+# O VerseIndex é gravado num ficheiro binário para que o servidor arranque sem
+# reler e tokenizar a Bíblia inteira. Estrutura:
+#
+#   MAGIC | tamanho do cabeçalho (uint32) | cabeçalho JSON | secções binárias
+#
+# O cabeçalho guarda as versões do formato e da análise de texto, o resumo do
+# banco de origem (ver database.source_fingerprint), o SHA-256 das secções e o
+# tamanho/tipo de cada uma. Qualquer divergência faz load_index falhar com
+# InvalidArtifact, e o servidor volta a construir o índice a partir do banco.
+
+MAGIC = b"SALOMAO-INDEX\n"
+FORMAT_VERSION = 1
+
+# Separador dos textos/termos (não aparece nos versículos)
+_SEP = "\x00"
+
+
+class InvalidArtifact(Exception):
+    """Artefato ausente, corrompido ou de outra versão/banco."""
+
+
+def _sections(index):
+    terms = list(index.postings)
+    offsets = array("I", [0])
+    docs = array("I")
+    freqs = array("H")
+    for term in terms:
+        term_docs, term_freqs = index.postings[term]
+        docs.extend(term_docs)
+        freqs.extend(term_freqs)
+        offsets.append(len(docs))
+    books = json.dumps(sorted(index.book_names.items()), ensure_ascii=False)
+    return [
+        ("books", "json", books.encode("utf-8")),
+        ("texts", "utf8", _SEP.join(index.texts).encode("utf-8")),
+        ("book_ids", "H", index.book_ids.tobytes()),
+        ("chapters", "H", index.chapters.tobytes()),
+        ("verses", "H", index.verses.tobytes()),
+        ("doc_lengths", "H", index.doc_lengths.tobytes()),
+        ("terms", "utf8", _SEP.join(terms).encode("utf-8")),
+        ("posting_offsets", "I", offsets.tobytes()),
+        ("posting_docs", "I", docs.tobytes()),
+        ("posting_freqs", "H", freqs.tobytes()),
+    ]
+
+
+def save_index(index, path, source):
+    """Grava o índice em path (de forma atómica). source = resumo do banco de origem."""
+    sections = _sections(index)
+    payload = b"".join(data for _, _, data in sections)
+    header = {
+        "format": FORMAT_VERSION,
+        "analyzer": ANALYZER_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "byteorder": sys.byteorder,
+        "source": source,
+        "stats": index.stats(),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "sections": [[name, kind, len(data)] for name, kind, data in sections],
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(payload)
+    # Quem estiver a ler nunca vê um ficheiro meio escrito
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(data):
+    if not data.startswith(MAGIC):
+        raise InvalidArtifact("não é um índice do Salomão")
+    start = len(MAGIC) + 4
+    if len(data) < start:
+        raise InvalidArtifact("ficheiro truncado")
+    (header_size,) = struct.unpack_from("<I", data, len(MAGIC))
+    if len(data) < start + header_size:
+        raise InvalidArtifact("ficheiro truncado")
+    try:
+        header = json.loads(bytes(data[start:start + header_size]).decode("utf-8"))
+    except ValueError as e:
+        raise InvalidArtifact(f"cabeçalho ilegível: {e}") from e
+    if not isinstance(header, dict):
+        raise InvalidArtifact("cabeçalho ilegível: não é um objeto JSON")
+    return header, start + header_size
+
+
+def _read_sections(header, payload):
+    swap = header.get("byteorder") != sys.byteorder
+    parts = {}
+    position = 0
+    for name, kind, size in header["sections"]:
+        chunk = payload[position:position + size]
+        position += size
+        if kind in ("json", "utf8"):
+            text = bytes(chunk).decode("utf-8")
+            parts[name] = json.loads(text) if kind == "json" else (text.split(_SEP) if text else [])
+        elif kind in ("H", "I"):
+            values = array(kind)
+            values.frombytes(chunk)
+            if swap:
+                values.byteswap()
+            parts[name] = values
+        else:
+            raise ValueError(f"secção {name} com tipo desconhecido {kind!r}")
+    if position != len(payload):
+        raise ValueError("tamanho das secções não confere com o ficheiro")
+    return parts
+
+
+def _build_index(parts):
+    index = VerseIndex()
+    index.book_names = {int(book_id): str(name) for book_id, name in parts["books"]}
+    index.texts = parts["texts"]
+    index.book_ids = parts["book_ids"]
+    index.chapters = parts["chapters"]
+    index.verses = parts["verses"]
+    index.doc_lengths = parts["doc_lengths"]
+    n_docs = len(index.texts)
+    if not (len(index.book_ids) == len(index.chapters) == len(index.verses) == len(index.doc_lengths) == n_docs):
+        raise ValueError("colunas dos versículos com tamanhos diferentes")
+
+    terms = parts["terms"]
+    offsets, docs, freqs = parts["posting_offsets"], parts["posting_docs"], parts["posting_freqs"]
+    if len(offsets) != len(terms) + 1 or offsets[-1] != len(docs) or len(freqs) != len(docs):
+        raise ValueError("listas de ocorrências inconsistentes")
+    if docs and max(docs) >= n_docs:
+        raise ValueError("ocorrência aponta para um versículo inexistente")
+    index.postings = {
+        term: (docs[offsets[i]:offsets[i + 1]], freqs[offsets[i]:offsets[i + 1]])
+        for i, term in enumerate(terms)
+    }
+    index.finalize()
+    return index
+
+
+def load_index(path, source=None):
+    """Lê e valida o artefato. Retorna (VerseIndex, cabeçalho) ou levanta InvalidArtifact.
+
+    Se source for indicado, o artefato tem de ter sido construído a partir desse banco.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise InvalidArtifact(f"não foi possível ler {path}: {e}") from e
+
+    header, offset = read_header(data)
+    if header.get("format") != FORMAT_VERSION:
+        raise InvalidArtifact(f"formato {header.get('format')} (esperado {FORMAT_VERSION})")
+    if header.get("analyzer") != ANALYZER_VERSION:
+        raise InvalidArtifact(f"análise de texto v{header.get('analyzer')} (esperada v{ANALYZER_VERSION})")
+    if source is not None and header.get("source") != source:
+        raise InvalidArtifact("construído a partir de outra versão do banco")
+
+    payload = memoryview(data)[offset:]
+    if hashlib.sha256(payload).hexdigest() != header.get("sha256"):
+        raise InvalidArtifact("checksum SHA-256 não confere (ficheiro corrompido)")
+
+    # O checksum não cobre o cabeçalho: qualquer incoerência na estrutura também invalida
+    try:
+        index = _build_index(_read_sections(header, payload))
+    except (KeyError, TypeError, ValueError, IndexError, struct.error) as e:
+        raise InvalidArtifact(f"estrutura inválida: {e}") from e
+    return index, header
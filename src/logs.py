@@ -0,0 +1,38 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# --- LOGGING NÃO BLOQUEANTE ---
+#
+# Os pedidos só colocam o registo numa fila em memória (QueueHandler); uma thread
+# do QueueListener formata e escreve no stderr. O nível vem de LOG_LEVEL (padrão INFO).
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(threadName)s] %(message)s"
+
+_listener = None
+
+
+def setup_logging(level=None):
+    """Configura o logger "salomao" uma única vez e devolve-o."""
+    global _listener
+    logger = logging.getLogger("salomao")
+    if _listener is not None:
+        return logger
+
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    records = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    # Esvazia a fila ao sair para não perder as últimas mensagens
+    atexit.register(_listener.stop)
+    return logger
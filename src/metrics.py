@@ -0,0 +1,172 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# --- MÉTRICAS (FORMATO PROMETHEUS) ---
+#
+# Contadores e histogramas em memória, sem dependências externas. Cada série é
+# identificada pelo nome + valores dos labels; /api/metrics chama render().
+
+logger = logging.getLogger("salomao.metrics")
+
+# Limites dos histogramas de latência, em segundos (de 0,1 ms a 60 s)
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+VERSE_BUCKETS = (0, 1, 2, 3, 5, 10, 20)
+CHAR_BUCKETS = (0, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [contagem por bucket..., +Inf], soma
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = (("le", _format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._gauge_callbacks = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name, help_text, callback):
+        """callback() devolve o valor atual, ou um dict {((label, valor), ...): valor}."""
+        self._gauge_callbacks.append((name, help_text, callback))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help_text, callback in self._gauge_callbacks:
+            try:
+                value = callback()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            if isinstance(value, dict):
+                for labels, v in sorted(value.items()):
+                    names = tuple(k for k, _ in labels)
+                    values = tuple(val for _, val in labels)
+                    lines.append(f"{name}{_format_labels(names, values)} {_format_value(v)}")
+            elif value is not None:
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.counter("salomao_requests_total", "Pedidos de chat recebidos.", ("route",))
+ERRORS = registry.counter("salomao_errors_total", "Pedidos de chat que terminaram em erro, por tipo.", ("route", "type"))
+RATE_LIMITED = registry.counter("salomao_rate_limited_total", "Respostas 429, por origem (admissão, cota local ou Gemini).", ("source",))
+CACHE_LOOKUPS = registry.counter("salomao_answer_cache_lookups_total", "Consultas à cache de respostas.", ("result",))
+REQUEST_SECONDS = registry.histogram("salomao_request_seconds", "Duração total dos pedidos de chat.", ("route",))
+STAGE_SECONDS = registry.histogram("salomao_stage_seconds", "Duração de cada etapa do pedido.", ("stage",))
+MODEL_CALLS = registry.counter("salomao_model_calls_total", "Chamadas ao Gemini por modelo e resultado.", ("model", "outcome"))
+MODEL_SECONDS = registry.histogram("salomao_model_seconds", "Latência das chamadas ao Gemini por modelo e resultado.", ("model", "outcome"))
+CONTEXT_VERSES = registry.histogram("salomao_context_verses", "Versículos enviados no contexto do prompt.", buckets=VERSE_BUCKETS)
+CONTEXT_CHARS = registry.histogram("salomao_context_chars", "Tamanho do contexto do prompt em caracteres.", buckets=CHAR_BUCKETS)
+
+
+@contextmanager
+def span(stage):
+    """Mede um bloco e regista-o em salomao_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("⏱️ %s: %.3f ms", stage, elapsed * 1000)
+
+
+def observe_context(context):
+    CONTEXT_VERSES.observe(context.count("\n") + 1 if context else 0)
+    CONTEXT_CHARS.observe(len(context))
@@ -0,0 +1,373 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import MODEL_CALLS, MODEL_SECONDS
+
+# --- ROTEADOR DE MODELOS GEMINI (CIRCUIT BREAKER + HEDGING) ---
+
+logger = logging.getLogger("salomao.models")
+
+# Falhas seguidas (429/5xx) para tirar um modelo de rotação. Com 10% de 429
+# aleatórios, três seguidas acontecem em 0,1% das vezes.
+FAILURE_THRESHOLD = 3
+# Tempo base que um modelo fica fora de rotação; dobra a cada reabertura
+# seguida até ao teto.
+BASE_COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+
+_RETRYABLE_CODES = ("429", "500", "502", "503", "504")
+
+
+def outcome_of(error):
+    if "429" in str(error) or getattr(error, "code", None) == 429:
+        return "rate_limited"
+    return "error"
+
+
+def is_circuit_error(error):
+    """Erros que indicam modelo indisponível (cota, 5xx ou modelo inexistente)."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and (code in (404, 429) or code >= 500):
+        return True
+    message = str(error)
+    return any(c in message for c in _RETRYABLE_CODES) or "404" in message or "not found" in message.lower()
+
+
+class CircuitBreaker:
+    """Fechado -> aberto após `threshold` falhas seguidas; meio-aberto (uma tentativa) quando o cooldown expira.
+
+    Cada abertura cria uma nova geração: chamadas iniciadas antes dela não fecham
+    o circuito ao terminar com sucesso, nem voltam a contar se falharem.
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, base_cooldown=BASE_COOLDOWN, max_cooldown=MAX_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.is_open = False
+        self.open_until = 0.0
+        self.generation = 0
+        self.trial_in_flight = False
+        self.last_error = None
+
+    def state(self, now=None):
+        now = time.monotonic() if now is None else now
+        if not self.is_open:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def allow(self, now=None):
+        state = self.state(now)
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def _open(self, now):
+        self.trips += 1
+        self.generation += 1
+        self.is_open = True
+        cooldown = min(self.base_cooldown * 2 ** (self.trips - 1), self.max_cooldown)
+        self.open_until = now + cooldown
+        self.trial_in_flight = False
+
+    def record_success(self, generation):
+        if self.is_open and generation != self.generation:
+            # Chamada iniciada antes da abertura: não diz nada sobre o estado atual
+            return
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.is_open = False
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    def record_failure(self, error, generation, now=None):
+        now = time.monotonic() if now is None else now
+        self.last_error = str(error)
+        if self.is_open:
+            # Só a tentativa de teste (ou forçada) reabre, com cooldown maior
+            if generation == self.generation:
+                self._open(now)
+            return
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.threshold:
+            self._open(now)
+
+    def release_trial(self):
+        # Falha que não conta para o circuito (ex.: pedido inválido): liberta a vaga de teste
+        self.trial_in_flight = False
+
+
+class ModelStats:
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.skipped = 0
+        self.forced = 0
+        self.no_quota = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+
+    def as_dict(self):
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "skipped": self.skipped,
+            "forced": self.forced,
+            "no_quota": self.no_quota,
+            "avg_latency_s": round(self.total_latency / self.successes, 3) if self.successes else None,
+            "last_latency_s": round(self.last_latency, 3) if self.last_latency is not None else None,
+        }
+
+
+class ModelRouter:
+    """Escolhe o modelo Gemini a usar, reaproveitando os clientes entre pedidos.
+
+    client_factory recebe o nome do modelo e devolve um objeto com generate_content
+    (por omissão genai.GenerativeModel). Com hedge_after > 0, se o modelo principal
+    não responder dentro desse tempo, o seguinte é disparado em paralelo e vence a
+    primeira resposta bem-sucedida.
+
+    Cada chamada além da primeira de um pedido (fallback ou hedge) só acontece se
+    charge_extra() devolver True, para que a cota local conte todas as chamadas
+    ao Gemini. max_workers deve cobrir os pedidos simultâneos × número de modelos,
+    senão as tentativas ficam na fila do pool e o hedge dispara por causa da espera.
+    """
+
+    def __init__(self, model_names, client_factory, hedge_after=None, max_workers=8, charge_extra=None):
+        self.model_names = list(model_names)
+        self.client_factory = client_factory
+        self.hedge_after = hedge_after or None
+        self.charge_extra = charge_extra
+        self._clients = {}
+        self._breakers = {name: CircuitBreaker() for name in self.model_names}
+        self._stats = {name: ModelStats() for name in self.model_names}
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+        self._executor = None
+
+    def client(self, model_name):
+        with self._lock:
+            client = self._clients.get(model_name)
+        if client is None:
+            client = self.client_factory(model_name)
+            with self._lock:
+                client = self._clients.setdefault(model_name, client)
+        return client
+
+    def _acquire(self, model_name, extra=False):
+        """Geração do circuito se o modelo pode ser tentado agora (e, se extra, há cota); senão None."""
+        with self._lock:
+            breaker = self._breakers[model_name]
+            if not breaker.allow():
+                self._stats[model_name].skipped += 1
+                return None
+            generation = breaker.generation
+        if extra and self.charge_extra is not None and not self.charge_extra():
+            with self._lock:
+                self._breakers[model_name].release_trial()
+                self._stats[model_name].no_quota += 1
+            logger.warning("⚠️ Cota local esgotada: %s não será tentado.", model_name)
+            return None
+        return generation
+
+    def _candidates(self):
+        """Gera (modelo, geração) por ordem de prioridade, só quando o anterior falhou.
+
+        Se todos os circuitos estiverem abertos, tenta mesmo assim o que reabre
+        primeiro, para o pedido não falhar sem nenhuma chamada ao Gemini.
+        """
+        tried = 0
+        for model_name in self.model_names:
+            generation = self._acquire(model_name, extra=tried > 0)
+            if generation is not None:
+                tried += 1
+                yield model_name, generation
+        if tried == 0:
+            with self._lock:
+                model_name = min(self.model_names, key=lambda name: self._breakers[name].open_until)
+                self._stats[model_name].forced += 1
+                generation = self._breakers[model_name].generation
+            logger.info("🔁 Todos os circuitos abertos; tentando %s mesmo assim.", model_name)
+            yield model_name, generation
+
+    def last_known_error(self):
+        with self._lock:
+            errors = [b.last_error for b in self._breakers.values()
+                      if (b.is_open or b.consecutive_failures) and b.last_error]
+        return errors[0] if errors else "Todos os modelos estão temporariamente fora de rotação."
+
+    def _record_start(self, model_name):
+        with self._lock:
+            self._stats[model_name].attempts += 1
+
+    def _record_success(self, model_name, latency, generation):
+        MODEL_CALLS.inc(model=model_name, outcome="ok")
+        MODEL_SECONDS.observe(latency, model=model_name, outcome="ok")
+        with self._lock:
+            stats = self._stats[model_name]
+            stats.successes += 1
+            stats.total_latency += latency
+            stats.last_latency = latency
+            self._breakers[model_name].record_success(generation)
+
+    def _record_failure(self, model_name, error, latency, generation):
+        outcome = outcome_of(error)
+        MODEL_CALLS.inc(model=model_name, outcome=outcome)
+        MODEL_SECONDS.observe(latency, model=model_name, outcome=outcome)
+        with self._lock:
+            stats = self._stats[model_name]
+            stats.failures += 1
+            if outcome == "rate_limited":
+                stats.rate_limited += 1
+            breaker = self._breakers[model_name]
+            if is_circuit_error(error):
+                breaker.record_failure(error, generation)
+            else:
+                breaker.release_trial()
+
+    def _call(self, model_name, prompt, generation_config, generation):
+        self._record_start(model_name)
+        start = time.perf_counter()
+        try:
+            logger.debug("⚡ Tentando usar modelo: %s...", model_name)
+            response = self.client(model_name).generate_content(
+                prompt,
+                generation_config=generation_config
+            )
+            text = response.text
+        except Exception as e:
+            logger.warning("⚠️ Modelo %s não disponível: %s", model_name, e)
+            self._record_failure(model_name, e, time.perf_counter() - start, generation)
+            raise
+        self._record_success(model_name, time.perf_counter() - start, generation)
+        logger.info("✅ Sucesso com %s", model_name)
+        return text
+
+    def generate(self, prompt, generation_config):
+        """Retorna (texto, modelo, None) em caso de sucesso ou (None, None, último_erro)."""
+        if self.hedge_after:
+            return self._generate_hedged(prompt, generation_config)
+
+        last_error = None
+        for model_name, generation in self._candidates():
+            try:
+                return self._call(model_name, prompt, generation_config, generation), model_name, None
+            except Exception as e:
+                last_error = str(e)
+        return None, None, last_error or self.last_known_error()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="gemini")
+            return self._executor
+
+    def _generate_hedged(self, prompt, generation_config):
+        pool = self._pool()
+        pending = {}
+        candidates = self._candidates()
+        exhausted = False
+        last_error = None
+
+        def launch():
+            # Dispara o próximo modelo disponível; False se não houver mais nenhum
+            nonlocal exhausted
+            candidate = None if exhausted else next(candidates, None)
+            if candidate is None:
+                exhausted = True
+                return False
+            model_name, generation = candidate
+            pending[pool.submit(self._call, model_name, prompt, generation_config, generation)] = model_name
+            return True
+
+        launch()
+        while pending:
+            # Espera pelo orçamento de latência; se nada terminar, dispara o próximo modelo
+            timeout = None if exhausted else self.hedge_after
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info("⏱️ Sem resposta em %ss, disparando o próximo modelo em paralelo...", self.hedge_after)
+                launch()
+                continue
+            for future in done:
+                model_name = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    # Os restantes continuam em segundo plano só para atualizar as estatísticas
+                    return future.result(), model_name, None
+                last_error = str(error)
+                # Falhou rápido: não espera pelo orçamento para tentar o próximo
+                launch()
+        return None, None, last_error or self.last_known_error()
+
+    def stream(self, prompt, generation_config):
+        """Gera ("token", texto) por chunk; termina com ("error", último_erro) se falhar.
+
+        Só troca de modelo enquanto nenhum pedaço foi enviado (sem hedging no streaming).
+        """
+        last_error = None
+        for model_name, generation in self._candidates():
+            sent_any = False
+            self._record_start(model_name)
+            start = time.perf_counter()
+            try:
+                logger.debug("⚡ Tentando usar modelo (stream): %s...", model_name)
+                response = self.client(model_name).generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    stream=True
+                )
+                for chunk in response:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunk sem partes de texto (ex.: só metadados de segurança)
+                        continue
+                    if text:
+                        sent_any = True
+                        yield "token", text
+            except GeneratorExit:
+                # Cliente desligou a meio do stream: não conta como falha do modelo
+                MODEL_CALLS.inc(model=model_name, outcome="cancelled")
+                with self._lock:
+                    self._breakers[model_name].release_trial()
+                raise
+            except Exception as e:
+                logger.warning("⚠️ Modelo %s não disponível: %s", model_name, e)
+                self._record_failure(model_name, e, time.perf_counter() - start, generation)
+                last_error = str(e)
+                if sent_any:
+                    # A resposta já começou a ser exibida: não mistura dois modelos
+                    yield "error", f"Resposta interrompida. Último erro: {last_error}"
+                    return
+                continue
+            self._record_success(model_name, time.perf_counter() - start, generation)
+            logger.info("✅ Sucesso com %s", model_name)
+            return
+
+        yield "error", last_error or self.last_known_error()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for name in self.model_names:
+                breaker = self._breakers[name]
+                result[name] = {
+                    **self._stats[name].as_dict(),
+                    "circuit": breaker.state(now),
+                    "retry_in_s": round(max(breaker.open_until - now, 0.0), 1),
+                    "last_error": breaker.last_error,
+                }
+            return {"hedge_after_s": self.hedge_after, "models": result}
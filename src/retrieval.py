@@ -0,0 +1,279 @@
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+
+# --- MOTOR DE BUSCA EM MEMÓRIA (BM25) ---
+
+# Parâmetros clássicos do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Versão da análise de texto (tokenize/stem/STOPWORDS). Incrementar sempre que a
+# análise mudar: os índices pré-construídos com outra versão deixam de ser aceites.
+ANALYZER_VERSION = 2
+
+# Palavras vazias do português, já sem acentos (a comparação é feita depois da normalização)
+STOPWORDS = frozenset("""
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele
+deles depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta estao
+estas estava este estes eu foi for foram ha isso isto ja la lhe lhes mais mas me mesmo meu
+meus minha minhas muito na nao nas nem no nos nossa nossas nosso nossos num numa o os ou
+para pela pelas pelo pelos por qual quando que quem se sem ser seu seus so sua suas tambem
+te tem ter teu tua tuas um uma umas uns voce voces vos
+fala falar diz dizer sobre biblia quais porque pois onde
+""".split())
+
+# Sufixos removidos pelo stemmer leve (do mais longo para o mais curto)
+_PLURAL_SUFFIXES = (
+    ("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"),
+    ("ois", "ol"), ("res", "r"), ("ns", "m"), ("s", ""),
+)
+_DERIVATION_SUFFIXES = ("amente", "mente", "idade", "cao", "ismo", "ista")
+_INFINITIVE_SUFFIXES = ("ar", "er", "ir")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Ex.: "João 3:16", "1 Coríntios 13:4-7", "Salmos 23", "Cântico dos Cânticos 2:1"
+_REFERENCE_RE = re.compile(
+    r"(?<!\w)((?:[123]\s*)?[^\W\d_]+(?:\s+(?:dos|das|de)\s+[^\W\d_]+)?)"
+    r"\s+(\d{1,3})(?:\s*[:.,]\s*(\d{1,3})(?:\s*-\s*(\d{1,3}))?)?(?!\w)"
+)
+
+# Abreviações canónicas (minúsculas, sem espaços) -> início do nome do livro, já sem acentos.
+# Conferidas antes do nome por extenso: "Jo" é João e não Jó, "At" é Atos.
+# Só valem com versículo ("Jo 3:16"), porque várias coincidem com palavras comuns ("Os 10").
+BOOK_ABBREVIATIONS = {
+    "gn": "genesis", "ex": "exodo", "êx": "exodo", "lv": "levitico", "nm": "numeros",
+    "dt": "deuteronomio", "js": "josue", "jz": "juizes", "rt": "rute",
+    "1sm": "1samuel", "2sm": "2samuel", "1rs": "1reis", "2rs": "2reis",
+    "1cr": "1cronicas", "2cr": "2cronicas", "ed": "esdras", "ne": "neemias", "et": "ester",
+    "sl": "salmo", "pv": "proverbios", "ec": "eclesiastes", "ct": "cantico", "is": "isaias",
+    "jr": "jeremias", "lm": "lamentacoes", "ez": "ezequiel", "dn": "daniel", "os": "oseias",
+    "jl": "joel", "am": "amos", "ob": "obadias", "jn": "jonas", "mq": "miqueias", "na": "naum",
+    "hc": "habacuque", "sf": "sofonias", "ag": "ageu", "zc": "zacarias", "ml": "malaquias",
+    "mt": "mateus", "mc": "marcos", "lc": "lucas", "jo": "joao", "at": "atos", "rm": "romanos",
+    "1co": "1corintios", "2co": "2corintios", "gl": "galatas", "ef": "efesios",
+    "fp": "filipenses", "cl": "colossenses", "1ts": "1tessalonicenses", "2ts": "2tessalonicenses",
+    "1tm": "1timoteo", "2tm": "2timoteo", "tt": "tito", "fm": "filemom", "hb": "hebreus",
+    "tg": "tiago", "1pe": "1pedro", "2pe": "2pedro", "1jo": "1joao", "2jo": "2joao",
+    "3jo": "3joao", "jd": "judas", "ap": "apocalipse",
+}
+_CONNECTORS = frozenset(("dos", "das", "de"))
+
+
+def fold(text):
+    """Minúsculas e sem acentos: 'Coração' -> 'coracao'."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(token):
+    if len(token) <= 3:
+        return token
+    for suffix, replacement in _PLURAL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)] + replacement
+            break
+    derived = False
+    for suffix in _DERIVATION_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            derived = True
+            break
+    # Infinitivo -> radical do verbo: "orar" -> "or", "salvar" -> "salv"
+    if not derived and token[-2:] in _INFINITIVE_SUFFIXES:
+        token = token[:-2]
+    # Reduz a flexão de género (também depois do sufixo derivacional, para que
+    # "salvação", "salvo" e "salvar" caiam todos em "salv" e "oração" em "or")
+    if token[-1] in "aoe" and len(token) >= (3 if derived else 5):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Normaliza, remove stopwords e aplica o stemmer leve."""
+    return [stem(t) for t in _TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+
+
+class VerseIndex:
+    """Índice invertido compacto sobre as tabelas verse/book da NVI.
+
+    Os versículos ficam em arrays paralelos (posição = id interno do documento) e
+    cada termo aponta para um par de arrays (documentos, frequências).
+    """
+
+    def __init__(self):
+        self.texts = []
+        self.book_ids = array("H")
+        self.chapters = array("H")
+        self.verses = array("H")
+        self.doc_lengths = array("H")
+        self.book_names = {}
+        self.postings = {}
+        self.avg_doc_length = 0.0
+        self._references = {}
+        self._books_by_name = {}
+
+    def __len__(self):
+        return len(self.texts)
+
+    @classmethod
+    def from_connection(cls, conn):
+        index = cls()
+        cursor = conn.execute("SELECT id, name FROM book")
+        for book_id, name in cursor.fetchall():
+            index.book_names[book_id] = name
+        cursor = conn.execute(
+            "SELECT book_id, chapter, verse, text FROM verse ORDER BY book_id, chapter, verse"
+        )
+        for book_id, chapter, verse, text in cursor:
+            index.add(book_id, chapter, verse, text)
+        index.finalize()
+        return index
+
+    def add(self, book_id, chapter, verse, text):
+        doc = len(self.texts)
+        self.texts.append(text)
+        self.book_ids.append(book_id)
+        self.chapters.append(chapter)
+        self.verses.append(verse)
+        terms = tokenize(text)
+        self.doc_lengths.append(min(len(terms), 0xFFFF))
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("H"))
+            posting[0].append(doc)
+            posting[1].append(min(tf, 0xFFFF))
+
+    def finalize(self):
+        total = sum(self.doc_lengths)
+        self.avg_doc_length = total / len(self.doc_lengths) if self.doc_lengths else 0.0
+        self._references = {
+            key: doc for doc, key in enumerate(zip(self.book_ids, self.chapters, self.verses))
+        }
+        self._books_by_name = {}
+        for book_id, name in self.book_names.items():
+            key = fold(name).replace(" ", "")
+            self._books_by_name[key] = book_id
+
+    # --- Referências explícitas ---
+
+    def _lookup_key(self, key):
+        if key in self._books_by_name:
+            return [self._books_by_name[key]]
+        if len(key) < 3:
+            return []
+        # Início do nome ("Gên", "Apoc", "1Cor")
+        return [book_id for book_name, book_id in self._books_by_name.items() if book_name.startswith(key)]
+
+    def book_candidates(self, name):
+        """Livros que o nome pode designar: [] se nenhum, mais de um se for ambíguo."""
+        abbreviation = BOOK_ABBREVIATIONS.get(name.lower().replace(" ", ""))
+        if abbreviation is not None:
+            return self._lookup_key(abbreviation)
+        return self._lookup_key(fold(name).replace(" ", ""))
+
+    def resolve_book(self, name):
+        matches = self.book_candidates(name)
+        return matches[0] if len(matches) == 1 else None
+
+    def _reference_book(self, name, abbreviations):
+        # "Apocalipse de João", "Atos dos Apóstolos": primeiro o nome inteiro e as palavras
+        # iniciais; "Evangelho de João": por fim só a última palavra
+        words = name.split()
+        attempts = [" ".join(words[:i]) for i in range(len(words), 0, -1) if words[i - 1].lower() not in _CONNECTORS]
+        if len(words) > 1:
+            attempts.append(words[-1])
+        for attempt in attempts:
+            if not abbreviations and attempt.lower().replace(" ", "") in BOOK_ABBREVIATIONS:
+                # "Jo 3" ou "Os 10" sem versículo: não arrisca cair em Jó nem num livro qualquer
+                return None
+            matches = self.book_candidates(attempt)
+            if len(matches) == 1:
+                return matches[0]
+            if matches:
+                # Ambíguo: melhor nenhum versículo do que o de outro livro
+                return None
+        return None
+
+    def find_references(self, query):
+        docs = []
+        for match in _REFERENCE_RE.finditer(query):
+            book_id = self._reference_book(match.group(1), abbreviations=match.group(3) is not None)
+            if book_id is None:
+                continue
+            chapter = int(match.group(2))
+            if match.group(3) is None:
+                first, last = 1, None
+            else:
+                first = int(match.group(3))
+                last = int(match.group(4)) if match.group(4) else first
+            verse = first
+            while last is None or verse <= last:
+                doc = self._references.get((book_id, chapter, verse))
+                if doc is None:
+                    break
+                docs.append(doc)
+                verse += 1
+        return docs
+
+    # --- Busca por relevância ---
+
+    def score(self, query):
+        terms = set(tokenize(query))
+        n_docs = len(self.texts)
+        scores = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, freqs = posting
+            df = len(docs)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1 - BM25_B)
+            length_weight = BM25_K1 * BM25_B / (self.avg_doc_length or 1.0)
+            doc_lengths = self.doc_lengths
+            for doc, tf in zip(docs, freqs):
+                denom = tf + norm + length_weight * doc_lengths[doc]
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / denom
+        return scores
+
+    def search(self, query, k=5):
+        """Devolve até k linhas (book, chapter, verse, text): referências primeiro, depois BM25."""
+        docs = self.find_references(query)[:k]
+        if len(docs) < k:
+            seen = set(docs)
+            scores = self.score(query)
+            for doc in seen:
+                scores.pop(doc, None)
+            ranked = heapq.nlargest(k - len(docs), scores.items(), key=lambda item: item[1])
+            docs.extend(doc for doc, _ in ranked)
+        return [self.row(doc) for doc in docs]
+
+    def row(self, doc):
+        return {
+            "book": self.book_names.get(self.book_ids[doc], "?"),
+            "chapter": self.chapters[doc],
+            "verse": self.verses[doc],
+            "text": self.texts[doc],
+        }
+
+    def stats(self):
+        return {
+            "verses": len(self.texts),
+            "terms": len(self.postings),
+            "books": len(self.book_names),
+            "avg_doc_length": round(self.avg_doc_length, 2),
+        }
+
+
+def build_match_expression(query):
+    """Expressão FTS5 tolerante (termos unidos por OR) para o caminho de fallback em SQL."""
+    terms = [t for t in _TOKEN_RE.findall(fold(query)) if t not in STOPWORDS]
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))